@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from campusanon.redis import redis_client
+from .models import User
+
+# request.user without a DB query per request. Lookup order:
+#   1. in-process LRU, entries live LOCAL_TTL seconds
+#   2. Redis hash auth_user:{id} (one field per column), REDIS_TTL seconds
+#   3. the database, which refills both
+# User save / delete drops the Redis hash and this process's entry
+# (accounts/signals.py). Other processes notice within LOCAL_TTL seconds:
+# that bounds how long a ban or a staff change takes to apply.
+
+LOCAL_TTL = 5
+LOCAL_SIZE = 4096
+REDIS_TTL = 10 * 60
+
+# Everything but the password hash, which stays in the database. Kept in
+# concrete field order, as User.from_db() expects.
+CACHED_FIELDS = [f for f in User._meta.concrete_fields if f.attname != "password"]
+CACHED_NAMES = [f.attname for f in CACHED_FIELDS]
+
+_local = OrderedDict()
+_lock = threading.Lock()
+
+
+def user_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def generation_key(user_id):
+    return f"auth_user_gen:{user_id}"
+
+
+# Refill only if no invalidation happened since the miss was read: a slow
+# DB load can't put a pre-ban row back into Redis.
+_store = redis_client.register_script("""
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+""")
+
+
+def invalidate_user(user_id):
+    user_id = str(user_id)
+    with _lock:
+        _local.pop(user_id, None)
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.incr(generation_key(user_id))
+    pipe.delete(user_key(user_id))
+    pipe.execute()
+
+
+def _local_get(user_id):
+    with _lock:
+        entry = _local.get(user_id)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at < time.monotonic():
+            del _local[user_id]
+            return None
+        _local.move_to_end(user_id)
+        return values
+
+
+def _local_set(user_id, values):
+    with _lock:
+        _local[user_id] = (time.monotonic() + LOCAL_TTL, values)
+        _local.move_to_end(user_id)
+        while len(_local) > LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def _decode(raw):
+    try:
+        return tuple(field.to_python(orjson.loads(raw[field.attname])) for field in CACHED_FIELDS)
+    except (KeyError, ValueError, ValidationError):
+        # Written before a schema change: treat as a miss
+        return None
+
+
+def _shared_get(user_id):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(user_key(user_id))
+    pipe.get(generation_key(user_id))
+    raw, generation = pipe.execute()
+
+    values = _decode(raw) if raw else None
+    if values is not None:
+        return values
+
+    try:
+        values = User.objects.filter(pk=user_id).values_list(*CACHED_NAMES).first()
+    except ValidationError:
+        return None
+    if values is None:
+        return None
+
+    fields = []
+    for name, value in zip(CACHED_NAMES, values):
+        fields += [name, orjson.dumps(value)]
+    _store(keys=[user_key(user_id), generation_key(user_id)], args=[generation or "0", REDIS_TTL, *fields])
+    return values
+
+
+def load_user(user_id):
+    """
+    The User with this id (password deferred), or None.
+    """
+    user_id = str(user_id)
+    values = _local_get(user_id)
+    if values is None:
+        values = _shared_get(user_id)
+        if values is None:
+            return None
+        _local_set(user_id, values)
+
+    # Fresh instance per request, built like a queryset row
+    return User.from_db(DEFAULT_DB_ALIAS, CACHED_NAMES, values)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with the user loaded through load_user().
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Compares against the password hash, which is never cached
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
@@ -0,0 +1,52 @@
+import hashlib
+
+from django.db import migrations
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+# The Redis layout of accounts/otp.py as of this migration, copied so later
+# changes to the app code can't change what it writes
+MAX_ATTEMPTS = 3
+
+
+def _store(redis_client, email, code, ttl, attempts):
+    key = f"otp:{hashlib.sha256(email.encode()).hexdigest()}"
+    digest = salted_hmac("accounts.otp", f"{email}:{code}").hexdigest()
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.hset(key, mapping={"code": digest, "attempts": attempts})
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+
+def copy_pending_otps(apps, schema_editor):
+    # Codes live for minutes: the still valid ones move to Redis, expired
+    # rows are dropped with the table.
+    from redis.exceptions import RedisError
+    from campusanon.redis import redis_client
+
+    EmailOTP = apps.get_model("accounts", "EmailOTP")
+    now = timezone.now()
+    pending = EmailOTP.objects.filter(expires_at__gt=now, attempts__lt=MAX_ATTEMPTS)
+    try:
+        for record in pending.iterator():
+            ttl = int((record.expires_at - now).total_seconds())
+            if ttl > 0:
+                _store(redis_client, record.email, record.otp, ttl, record.attempts)
+    except RedisError:
+        # Redis unreachable while migrating: those users just request a new code
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_pending_otps, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='EmailOTP',
+        ),
+    ]
@@ -1,7 +1,6 @@
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.utils import timezone
 from django.contrib.auth.base_user import BaseUserManager  # 👈 Added import
 
 # ✅ New Custom Manager
@@ -68,13 +67,3 @@ class User(AbstractUser):
 
     def __str__(self):
         return str(self.id)
-
-
-class EmailOTP(models.Model):
-    email = models.EmailField()
-    otp = models.CharField(max_length=6)
-    expires_at = models.DateTimeField()
-    attempts = models.IntegerField(default=0)
-
-    def is_expired(self):
-        return timezone.now() > self.expires_at
\ No newline at end of file
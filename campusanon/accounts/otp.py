@@ -0,0 +1,107 @@
+import hashlib
+
+from django.utils.crypto import salted_hmac
+
+from campusanon.redis import redis_client
+
+# Login codes live in Redis, never in the database:
+#   otp:{sha256(email)}       hash {code, attempts}, expires after OTP_TTL
+#   otp_lock:{sha256(email)}  set after MAX_ATTEMPTS wrong guesses, blocks
+#                             new codes and guesses for LOCKOUT_TTL
+# Codes are stored as an HMAC, not in clear. Verification and the attempt
+# counter run in one Lua script: parallel guesses can't share an attempt.
+# A correct code stays until consume() deletes it once the login / sign-up
+# went through (a new user may resend it with year and branch); consume()
+# checks the code again, so it still works exactly once.
+
+OTP_TTL = 5 * 60
+MAX_ATTEMPTS = 3
+LOCKOUT_TTL = 15 * 60
+
+# verify() results
+OK = "ok"
+INVALID = "invalid"
+MISSING = "missing"
+LOCKED = "locked"
+
+
+def _email_digest(email):
+    return hashlib.sha256(email.encode()).hexdigest()
+
+
+def otp_key(email):
+    return f"otp:{_email_digest(email)}"
+
+
+def lock_key(email):
+    return f"otp_lock:{_email_digest(email)}"
+
+
+def _code_digest(email, code):
+    return salted_hmac("accounts.otp", f"{email}:{code}").hexdigest()
+
+
+_verify = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 'locked'
+end
+local code = redis.call('HGET', KEYS[1], 'code')
+if not code then
+    return 'missing'
+end
+if code == ARGV[1] then
+    return 'ok'
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[3])
+    return 'locked'
+end
+return 'invalid'
+""")
+
+
+# Deletes the code only if it is still the one that was verified
+_consume = redis_client.register_script("""
+if redis.call('HGET', KEYS[1], 'code') == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+def store(email, code, ttl=OTP_TTL, attempts=0):
+    """
+    Saves `code` as the pending code for `email`, replacing any older one.
+    """
+    key = otp_key(email)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.hset(key, mapping={"code": _code_digest(email, code), "attempts": attempts})
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+
+def is_locked(email):
+    return bool(redis_client.exists(lock_key(email)))
+
+
+def verify(email, code):
+    """
+    Checks the pending code: OK, INVALID, MISSING (expired or never sent)
+    or LOCKED. Wrong codes count towards the lockout, a correct one stays
+    pending until consume().
+    """
+    return _verify(
+        keys=[otp_key(email), lock_key(email)],
+        args=[_code_digest(email, str(code).strip()), MAX_ATTEMPTS, LOCKOUT_TTL],
+    )
+
+
+def consume(email, code):
+    """
+    Deletes the pending code if it is `code`. False if it is gone already
+    (expired, or used by a parallel request).
+    """
+    return bool(_consume(keys=[otp_key(email)], args=[_code_digest(email, str(code).strip())]))
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import User
+from .authentication import invalidate_user
+
+
+# 🔒 Cached request users (accounts/authentication.py): bans, staff flags
+# and profile edits apply within seconds
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = instance.id
+    transaction.on_commit(lambda: invalidate_user(user_id))
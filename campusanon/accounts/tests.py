@@ -1,3 +1,207 @@
-from django.test import TestCase
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from redis.exceptions import RedisError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from campusanon.redis import redis_client
+from communities.models import Community
+from . import authentication, otp
+from .models import User
+from .utils import hash_email
+
+# Codes and the user cache live in Redis: these tests need a server at
+# REDIS_URL and are skipped without one.
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def redis_available():
+    try:
+        return redis_client.ping()
+    except RedisError:
+        return False
+
+
+requires_redis = skipUnless(redis_available(), "needs a Redis server at REDIS_URL")
+
+EMAIL = "student@aitpune.edu.in"
+
+
+@requires_redis
+class OTPStoreTests(TestCase):
+
+    def setUp(self):
+        keys = [otp.otp_key(EMAIL), otp.lock_key(EMAIL)]
+        redis_client.delete(*keys)
+        self.addCleanup(redis_client.delete, *keys)
+
+    def test_match(self):
+        otp.store(EMAIL, "123456")
+
+        self.assertEqual(otp.verify(EMAIL, "123456"), otp.OK)
+        self.assertEqual(otp.verify(EMAIL, " 123456 "), otp.OK)
+
+    def test_mismatch(self):
+        otp.store(EMAIL, "123456")
+
+        self.assertEqual(otp.verify(EMAIL, "654321"), otp.INVALID)
+        self.assertEqual(otp.verify(EMAIL, "123456"), otp.OK)
+
+    def test_lock_after_too_many_attempts(self):
+        otp.store(EMAIL, "123456")
+        for _ in range(otp.MAX_ATTEMPTS - 1):
+            self.assertEqual(otp.verify(EMAIL, "000000"), otp.INVALID)
+
+        self.assertEqual(otp.verify(EMAIL, "000000"), otp.LOCKED)
+        self.assertTrue(otp.is_locked(EMAIL))
+        # The right code doesn't help anymore
+        self.assertEqual(otp.verify(EMAIL, "123456"), otp.LOCKED)
+
+    def test_expiry(self):
+        otp.store(EMAIL, "123456")
+        self.assertLessEqual(redis_client.ttl(otp.otp_key(EMAIL)), otp.OTP_TTL)
+
+        redis_client.pexpire(otp.otp_key(EMAIL), 1)
+        time.sleep(0.01)
+
+        self.assertEqual(otp.verify(EMAIL, "123456"), otp.MISSING)
+
+    def test_consume_once(self):
+        otp.store(EMAIL, "123456")
+
+        self.assertFalse(otp.consume(EMAIL, "654321"))
+        self.assertTrue(otp.consume(EMAIL, "123456"))
+        self.assertFalse(otp.consume(EMAIL, "123456"))
+        self.assertEqual(otp.verify(EMAIL, "123456"), otp.MISSING)
+
+
+@requires_redis
+@override_settings(CACHES=LOCMEM_CACHES)
+class VerifyOTPViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Community.objects.create(name="1 IT", slug="1-it", year=1, branch="IT")
+        Community.objects.create(name="All", slug="all", is_global=True)
+
+    def setUp(self):
+        keys = [otp.otp_key(EMAIL), otp.lock_key(EMAIL)]
+        redis_client.delete(*keys)
+        self.addCleanup(redis_client.delete, *keys)
+        otp.store(EMAIL, "123456")
+        self.client = APIClient()
+
+    def verify(self, **extra):
+        return self.client.post("/auth/verify-otp/", {"email": EMAIL, "otp": "123456", **extra})
+
+    def test_sign_up_in_two_steps(self):
+        # First submit tells the app it's a new user, the code stays usable
+        first = self.verify()
+        self.assertEqual(first.status_code, 400)
+        self.assertIn("Year and Branch", first.data["error"])
+
+        second = self.verify(year=1, branch="Information Technology")
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.data["is_new_user"])
+        self.assertTrue(User.objects.filter(email_hash=hash_email(EMAIL)).exists())
+
+        # Used up
+        self.assertEqual(self.verify(year=1, branch="IT").status_code, 400)
+
+    def test_unknown_class_keeps_the_code(self):
+        self.assertEqual(self.verify(year=4, branch="IT").status_code, 400)
+
+        self.assertEqual(self.verify(year=1, branch="IT").status_code, 200)
+
+    def test_login(self):
+        User.objects.create(email_hash=hash_email(EMAIL), internal_username="user_x", year=1, branch="IT")
+
+        response = self.verify()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data["is_new_user"])
+        self.assertEqual(otp.verify(EMAIL, "123456"), otp.MISSING)
+
+    def test_wrong_code(self):
+        response = self.client.post("/auth/verify-otp/", {"email": EMAIL, "otp": "000000"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.exists())
+
+
+@requires_redis
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedUserTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email_hash=hash_email(EMAIL), internal_username="user_x", year=1, branch="IT"
+        )
+        keys = [authentication.user_key(self.user.id), authentication.generation_key(self.user.id)]
+        redis_client.delete(*keys)
+        self.addCleanup(redis_client.delete, *keys)
+        authentication._local.clear()
+        self.addCleanup(authentication._local.clear)
+
+        self.client = APIClient()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_cached_after_first_load(self):
+        self.assertEqual(authentication.load_user(self.user.id), self.user)
+        self.assertTrue(redis_client.exists(authentication.user_key(self.user.id)))
+
+        with self.assertNumQueries(0):
+            user = authentication.load_user(self.user.id)
+        self.assertEqual(user.internal_username, "user_x")
+
+        # Another process: no local entry, still no query
+        authentication._local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(authentication.load_user(self.user.id).branch, "IT")
+
+    def test_ban_invalidates(self):
+        self.assertFalse(authentication.load_user(self.user.id).is_banned)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_banned = True
+            self.user.save()
+
+        self.assertFalse(redis_client.exists(authentication.user_key(self.user.id)))
+        self.assertTrue(authentication.load_user(self.user.id).is_banned)
+
+    def test_request_after_profile_change_sees_it(self):
+        self.assertEqual(self.client.get("/auth/me/").data["branch"], "IT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.branch = "COMP"
+            self.user.save()
+
+        self.assertEqual(self.client.get("/auth/me/").data["branch"], "COMP")
+
+    def test_request_after_delete_is_rejected(self):
+        self.assertEqual(self.client.get("/auth/me/").status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).delete()
+
+        self.assertEqual(self.client.get("/auth/me/").status_code, 401)
+        self.assertIsNone(authentication.load_user(self.user.id))
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        store = authentication._store
+
+        def change_then_store(keys, args):
+            # Saved (and committed) after the load's query
+            User.objects.filter(pk=self.user.pk).update(is_banned=True)
+            authentication.invalidate_user(self.user.id)
+            return store(keys=keys, args=args)
+
+        with mock.patch.object(authentication, "_store", change_then_store):
+            self.assertFalse(authentication.load_user(self.user.id).is_banned)
+        self.assertFalse(redis_client.exists(authentication.user_key(self.user.id)))
+
+        authentication._local.clear()
+        self.assertTrue(authentication.load_user(self.user.id).is_banned)
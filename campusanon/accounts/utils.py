@@ -1,9 +1,7 @@
 import random
 import hashlib
-from datetime import timedelta
-from django.utils import timezone
 from django.core.mail import send_mail
-from .models import EmailOTP
+from . import otp as otp_store
 import string
 
 
@@ -25,18 +23,12 @@ def hash_email(email: str) -> str:
 def send_email_otp(email):
     otp = generate_otp()
 
-    EmailOTP.objects.update_or_create(
-        email=email,
-        defaults={
-            "otp": otp,
-            "expires_at": timezone.now() + timedelta(minutes=5),
-            "attempts": 0,
-        }
-    )
+    # Redis with TTL expiry (accounts/otp.py), a new code resets the attempts
+    otp_store.store(email, otp)
 
     send_mail(
         subject="Your Verification Code",
-        message=f"Your OTP is {otp}. It expires in 5 minutes.",
+        message=f"Your OTP is {otp}. It expires in {otp_store.OTP_TTL // 60} minutes.",
         from_email=None,  # uses DEFAULT_FROM_EMAIL
         recipient_list=[email],
     )
@@ -4,8 +4,9 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import User, EmailOTP
+from .models import User
 from .utils import send_email_otp, hash_email, generate_internal_username
+from . import otp as otp_store
 
 # ✅ Import Community Models directly for strict lookup
 from communities.models import Community, CommunityMembership
@@ -30,6 +31,12 @@ class SendOTPView(APIView):
                 status=403
             )
 
+        if otp_store.is_locked(email):
+            return Response(
+                {"error": "Too many failed attempts. Try again later."},
+                status=429
+            )
+
         try:
             send_email_otp(email)
             return Response({"message": "OTP sent successfully"})
@@ -56,18 +63,13 @@ class VerifyOTPView(APIView):
 
         email = raw_email.strip().lower()
 
-        # 2. Verify OTP
-        record = EmailOTP.objects.filter(email=email).first()
-        if not record:
-            return Response({"error": "No OTP found"}, status=400)
-        if record.is_expired():
-            return Response({"error": "OTP has expired"}, status=400)
-        if record.attempts >= 3:
-            record.delete()
+        # 2. Verify OTP (consumed below, once login / sign-up succeeds)
+        result = otp_store.verify(email, otp)
+        if result == otp_store.MISSING:
+            return Response({"error": "No OTP found or it has expired"}, status=400)
+        if result == otp_store.LOCKED:
             return Response({"error": "Too many failed attempts."}, status=400)
-        if record.otp != otp:
-            record.attempts += 1
-            record.save()
+        if result != otp_store.OK:
             return Response({"error": "Invalid OTP"}, status=400)
 
         # 3. Handle User
@@ -105,6 +107,9 @@ class VerifyOTPView(APIView):
                     status=400
                 )
 
+            if not otp_store.consume(email, otp):
+                return Response({"error": "No OTP found or it has expired"}, status=400)
+
             # Create User
             user = User.objects.create(
                 email_hash=email_hash,
@@ -130,6 +135,8 @@ class VerifyOTPView(APIView):
             user = User.objects.get(email_hash=email_hash)
             if user.is_banned:
                 return Response({"error": "This account has been banned."}, status=403)
+            if not otp_store.consume(email, otp):
+                return Response({"error": "No OTP found or it has expired"}, status=400)
             
             # 💡 IMPORTANT: We REMOVED the "Auto-Join Academic" block here.
             # Since the User model doesn't store 'division', we can't reliably 
@@ -145,7 +152,6 @@ class VerifyOTPView(APIView):
         Notification.objects.filter(recipient=user).delete()
         # 4. Generate Tokens
         refresh = RefreshToken.for_user(user)
-        record.delete()
 
         return Response({
             "message": "Login successful",
@@ -8,4 +8,23 @@ redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 redis_client = redis.Redis.from_url(
     redis_url,
     decode_responses=True  # Important: Returns strings instead of bytes
-)
\ No newline at end of file
+)
+
+
+def write_if_unchanged(generation_key, generation, write):
+    """
+    Runs `write(pipe)` as one MULTI/EXEC, but only if `generation_key` still
+    holds `generation` (read before loading what gets written). False if
+    something bumped it meanwhile: the caller's snapshot may be stale.
+    """
+    with redis_client.pipeline(transaction=True) as pipe:
+        try:
+            pipe.watch(generation_key)
+            if pipe.get(generation_key) != generation:
+                return False
+            pipe.multi()
+            write(pipe)
+            pipe.execute()
+            return True
+        except redis.WatchError:
+            return False
@@ -0,0 +1,25 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# UTC datetimes come out as "...Z", same as DRF's JSONEncoder; int dict
+# keys (leaderboard ranks) are stringified like json.dumps does.
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_fallback = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Drop-in replacement for rest_framework.renderers.JSONRenderer.
+    UUIDs and datetimes are serialized natively; anything orjson does not
+    know (Decimal, lazy strings, querysets...) goes through DRF's encoder.
+    """
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=_fallback.default, option=ORJSON_OPTIONS)
@@ -113,11 +113,16 @@ CORS_ALLOW_ALL_ORIGINS = True
 # =================================================
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication with request.user served from a cache
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'campusanon.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
@@ -144,6 +149,10 @@ CACHES = {
     }
 }
 
+# Write-behind likes: toggles are buffered in Redis and written to the
+# database by `manage.py flush_like_buffer` (see posts/like_buffer.py)
+LIKE_WRITE_BEHIND = os.getenv('LIKE_WRITE_BEHIND') == 'True'
+
 
 # =================================================
 # 🛡️ 9. SECURITY MIDDLEWARE
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db.models import Q
+from campusanon.redis import redis_client
+from .models import Community, CommunityMembership
+
+ACCESS_CACHE_TIMEOUT = 15 * 60
+
+# Membership changes bump the user's version, community create/edit/delete
+# bumps the global one. Either bump makes the cached set unreachable.
+GLOBAL_VERSION_KEY = "access_version:global"
+
+
+def user_version_key(user_id):
+    return f"access_version:user:{user_id}"
+
+
+def bump_user_access(user_id):
+    redis_client.incr(user_version_key(user_id))
+
+
+def bump_global_access():
+    redis_client.incr(GLOBAL_VERSION_KEY)
+
+
+def _compute_readable_ids(user):
+    """
+    The same rules the feed "Bouncer" used to run per request:
+    1. Global communities
+    2. Staff / superusers see everything
+    3. Year AND branch match (None means "any")
+    4. Explicit membership (clubs etc.)
+    """
+    communities = Community.objects.all()
+
+    if not (user.is_staff or user.is_superuser):
+        communities = communities.filter(
+            Q(is_global=True)
+            | (
+                (Q(year__isnull=True) | Q(year=user.year))
+                & (Q(branch__isnull=True) | Q(branch=user.branch))
+            )
+            | Q(id__in=CommunityMembership.objects.filter(user=user).values("community_id"))
+        )
+
+    return frozenset(str(pk) for pk in communities.values_list("id", flat=True))
+
+
+def _compute_home_ids(user):
+    """
+    What MyCommunitiesView lists: global + joined (staff: everything).
+    """
+    communities = Community.objects.all()
+
+    if not (user.is_staff or user.is_superuser):
+        communities = communities.filter(
+            Q(is_global=True)
+            | Q(id__in=CommunityMembership.objects.filter(user=user).values("community_id"))
+        )
+
+    return frozenset(str(pk) for pk in communities.values_list("id", flat=True))
+
+
+def _cached_ids(user, kind, compute):
+    global_version, user_version = redis_client.mget(
+        GLOBAL_VERSION_KEY, user_version_key(user.id)
+    )
+    cache_key = (
+        f"community_{kind}:{user.id}:{global_version or 0}:{user_version or 0}:"
+        f"{user.is_staff or user.is_superuser}:{user.year}:{user.branch}"
+    )
+
+    ids = cache.get(cache_key)
+    if ids is None:
+        ids = compute(user)
+        cache.set(cache_key, ids, timeout=ACCESS_CACHE_TIMEOUT)
+    return ids
+
+
+def readable_community_ids(user):
+    """
+    Set of community IDs (as strings) the user may read, cached in Redis.
+    """
+    return _cached_ids(user, "access", _compute_readable_ids)
+
+
+def home_community_ids(user):
+    """
+    Set of community IDs (as strings) merged into the user's home feed.
+    """
+    return _cached_ids(user, "home", _compute_home_ids)
+
+
+def can_read_community(user, community_id):
+    return str(community_id) in readable_community_ids(user)
@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+import time
+
+import redis
+from campusanon.redis import redis_client, redis_url
+
+logger = logging.getLogger(__name__)
+
+# A user counts as online for this long after their last feed read
+PRESENCE_WINDOW = 60
+
+# Heartbeats are debounced per (community, user) in-process: at most one
+# write per WRITE_INTERVAL, well inside PRESENCE_WINDOW.
+WRITE_INTERVAL = 20
+
+# Pending heartbeats are flushed in one pipeline by a background thread
+FLUSH_INTERVAL = 2
+
+# Presence is best-effort: a slow or dead Redis must never stall the flusher
+_flush_client = redis.Redis.from_url(
+    redis_url,
+    decode_responses=True,
+    socket_timeout=1,
+    socket_connect_timeout=1,
+)
+
+_lock = threading.Lock()
+_last_written = {}   # (community_id, user_id) -> ts of last accepted heartbeat
+_pending = {}        # (community_id, user_id) -> ts waiting for the next flush
+_flusher_pid = None
+
+
+def presence_key(community_id):
+    return f"presence:{community_id}"
+
+
+def record_heartbeat(community_id, user_id):
+    """
+    Marks a user active in a community. Never touches Redis on the caller's
+    thread, so feed reads don't pay for presence.
+    """
+    now = time.time()
+    key = (str(community_id), str(user_id))
+
+    with _lock:
+        if now - _last_written.get(key, 0) < WRITE_INTERVAL:
+            return
+        _last_written[key] = now
+        _pending[key] = now
+        _ensure_flusher()
+
+
+def _ensure_flusher():
+    # Called with _lock held. Threads don't survive a fork, so track the PID.
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name="presence-flusher", daemon=True).start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.warning("Presence flush failed", exc_info=True)
+
+
+def flush():
+    """
+    Writes every pending heartbeat in one pipeline.
+    """
+    now = time.time()
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        # Forget debounce entries that can no longer suppress anything
+        for key, ts in list(_last_written.items()):
+            if now - ts >= WRITE_INTERVAL:
+                del _last_written[key]
+
+    if not batch:
+        return
+
+    by_community = {}
+    for (community_id, user_id), ts in batch.items():
+        by_community.setdefault(community_id, {})[user_id] = ts
+
+    pipe = _flush_client.pipeline(transaction=False)
+    for community_id, members in by_community.items():
+        key = presence_key(community_id)
+        pipe.zadd(key, members)
+        # Quiet communities clean themselves up
+        pipe.expire(key, PRESENCE_WINDOW * 2)
+    pipe.execute()
+
+
+def online_count(community_id):
+    """
+    Trims stale members and counts the rest in one round trip.
+    Cost does not depend on how many keys Redis holds.
+    """
+    key = presence_key(community_id)
+    cutoff = time.time() - PRESENCE_WINDOW
+
+    pipe = redis_client.pipeline()
+    pipe.zremrangebyscore(key, "-inf", cutoff)
+    pipe.zcount(key, cutoff, "+inf")
+    _, count = pipe.execute()
+    return count
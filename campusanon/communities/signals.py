@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Community, CommunityMembership
+from .access import bump_user_access, bump_global_access
+
+
+# 🔒 Keep the cached access sets (communities/access.py) honest
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+def invalidate_user_access(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_user_access(user_id))
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_delete, sender=Community)
+def invalidate_global_access(sender, instance, **kwargs):
+    transaction.on_commit(bump_global_access)
@@ -10,7 +10,7 @@ from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta, timezone as dt_timezone
 from zoneinfo import ZoneInfo
-from campusanon.redis import redis_client
+from .presence import online_count
 
 from .utils import get_or_create_global_community  # ✅ Import this helper
 
@@ -263,14 +263,8 @@ class CommunityOnlineCountView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, community_id):
-        pattern = f"presence:{community_id}:*"
-        
-        # Use scan_iter for a more robust search across the keyspace
-        online_count = 0
-        for _ in redis_client.scan_iter(match=pattern):
-            online_count += 1
-            
+        # ZREMRANGEBYSCORE + ZCOUNT on presence:{community}, no keyspace scan
         return Response({
             "community_id": community_id,
-            "online_count": online_count
+            "online_count": online_count(community_id)
         })
\ No newline at end of file
@@ -1,7 +1,20 @@
 from django.contrib import admin
-from django.db.models import Count
 # ✅ Added 'Notification' to the imports
 from .models import Post, Comment, PostReport, CommentReport, AdminAuditLog, PostLike, Notification 
+from . import bulk_moderation
+
+
+def bulk_action(target, action, description):
+    """
+    Admin action running posts/bulk_moderation.py on the selected rows.
+    """
+    def run(modeladmin, request, queryset):
+        affected = bulk_moderation.apply(request.user, target, action, queryset)
+        modeladmin.message_user(request, f"{affected} {target}(s): {action} done")
+
+    run.__name__ = f"bulk_{action}"
+    return admin.action(description=description)(run)
+
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -25,37 +38,30 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('content', 'alias')
     list_editable = ('is_hidden',) 
     
-    def short_content(self, obj):
-        return obj.content[:50]
-
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(
-            total_likes=Count('likes', distinct=True),
-            total_reports=Count('reports', distinct=True)
-        )
+    # likes_count / reports_count are stored columns, no per-page aggregates
+    readonly_fields = ('likes_count', 'comments_count', 'reports_count')
 
-    @admin.display(description='Likes', ordering='total_likes')
-    def likes_count(self, obj):
-        return obj.total_likes
+    actions = [
+        bulk_action("post", "hide", "Hide selected posts"),
+        bulk_action("post", "unhide", "Unhide selected posts"),
+        bulk_action("post", "delete", "Delete selected posts (bulk, no per-row signals)"),
+    ]
 
-    @admin.display(description='Reports', ordering='total_reports')
-    def reports_count(self, obj):
-        return obj.total_reports
+    def short_content(self, obj):
+        return obj.content[:50]
 
 # ... (Keep CommentAdmin, PostReportAdmin, etc. unchanged)
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('alias', 'post', 'is_hidden', 'created_at', 'reports_count')
     list_filter = ('is_hidden',)
-    
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(total_reports=Count('reports'))
+    readonly_fields = ('likes_count', 'reports_count')
 
-    @admin.display(description='Reports', ordering='total_reports')
-    def reports_count(self, obj):
-        return obj.total_reports
+    actions = [
+        bulk_action("comment", "hide", "Hide selected comments"),
+        bulk_action("comment", "unhide", "Unhide selected comments"),
+        bulk_action("comment", "delete", "Delete selected comments and their replies (bulk)"),
+    ]
 
 @admin.register(PostReport)
 class PostReportAdmin(admin.ModelAdmin):
@@ -0,0 +1,245 @@
+from django.db import connection, transaction
+from django.db.models import CharField, Count, Exists, ExpressionWrapper, F, OuterRef, Subquery
+from django.db.models.functions import Greatest
+
+from campusanon.redis import redis_client
+from .models import (
+    Post, Comment, PostLike, PostReport, CommentLike, CommentReport,
+    Notification, AdminAuditLog, HIDE_ADMIN, HIDE_BAN,
+)
+from .feed_cache import bump_feed_version
+from . import timeline, rankings, post_cache, etags
+
+# Admin bulk moderation: hide / unhide / delete every post or comment a
+# selection matches. Each action is a few set-based statements in one
+# transaction, no per-row save() / delete() and so no per-row signals.
+# What the receivers would have refreshed is refreshed once per community
+# on commit: feeds and rankings are dropped and rebuild lazily.
+
+ACTIONS = ("hide", "unhide", "delete")
+
+# target -> (model, audit target_type, column that scopes the caches)
+TARGETS = {
+    "post": (Post, "Post", "community_id"),
+    "comment": (Comment, "Comment", "post_id"),
+}
+
+# Selection filters, combined with AND. community_id only narrows.
+FILTERS = ("ids", "alias", "user_id", "keyword", "community_id")
+
+AUDIT_BATCH_SIZE = 500
+
+# Only rows that actually change are touched and returned. Hides record
+# their hide_reason, so withdrawn reports never undo them; hiding what the
+# reports already hid records the admin too.
+_VISIBILITY_SQL = """
+    UPDATE {table} SET {hidden} = %s, {reason} = %s
+    WHERE {pk} IN ({selection}) AND ({hidden} <> %s OR {reason} <> %s)
+    RETURNING {pk}, {scope}
+"""
+
+
+def select(target, ids=None, alias=None, user_id=None, keyword=None, community_id=None):
+    """
+    Posts / comments matching every given filter. Raises ValidationError
+    for malformed IDs.
+    """
+    model = TARGETS[target][0]
+    queryset = model.objects.all()
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    if alias:
+        queryset = queryset.filter(alias=alias)
+    if user_id:
+        queryset = queryset.filter(user_id=user_id)
+    if keyword:
+        queryset = queryset.filter(content__icontains=keyword)
+    if community_id:
+        field = "community_id" if model is Post else "post__community_id"
+        queryset = queryset.filter(**{field: community_id})
+    return queryset.order_by()
+
+
+def apply(admin, target, action, queryset, reason=""):
+    """
+    Runs `action` on the rows of `queryset` and writes one audit entry per
+    affected row. Returns the number of affected rows (deleting comments
+    counts their replies too).
+    """
+    model, target_type, _ = TARGETS[target]
+    queryset = queryset.order_by()
+
+    with transaction.atomic():
+        if action == "delete":
+            rows = _delete_posts(queryset) if model is Post else _delete_comments(queryset)
+        else:
+            rows = _set_hidden(target, queryset, HIDE_ADMIN if action == "hide" else "")
+
+        AdminAuditLog.objects.bulk_create(
+            [
+                AdminAuditLog(
+                    admin=admin,
+                    action=f"{action.upper()}_{target.upper()}",
+                    target_id=pk,
+                    target_type=target_type,
+                    reason=reason,
+                )
+                for pk, _ in rows
+            ],
+            batch_size=AUDIT_BATCH_SIZE,
+        )
+        if rows:
+            transaction.on_commit(lambda: _refresh((model, rows, action == "delete")))
+
+    return len(rows)
+
+
+def purge_user(user):
+    """
+    Ban purge: hides every visible post and comment of `user`, one UPDATE
+    per table. What admins or reports hid already keeps its reason. Returns {"posts": n, "comments": m}.
+    """
+    return _user_content(user, hide=True)
+
+
+def restore_user(user):
+    """
+    Unban: brings back what purge_user() hid, nothing else. Returns the
+    counts like purge_user().
+    """
+    return _user_content(user, hide=False)
+
+
+def _user_content(user, hide):
+    counts, changes = {}, []
+    with transaction.atomic():
+        for target, (model, _, _) in TARGETS.items():
+            owned = model.objects.filter(user_id=user.id)
+            if hide:
+                rows = _set_hidden(target, owned.filter(is_hidden=False), HIDE_BAN)
+            else:
+                rows = _set_hidden(target, owned.filter(hide_reason=HIDE_BAN), "")
+            counts[f"{target}s"] = len(rows)
+            if rows:
+                changes.append((model, rows, False))
+        if changes:
+            transaction.on_commit(lambda: _refresh(*changes))
+    return counts
+
+
+def _set_hidden(target, queryset, reason):
+    # A hide_reason hides, "" unhides
+    hidden = bool(reason)
+    model, _, scope = TARGETS[target]
+    meta = model._meta
+    scope_field = meta.get_field(scope)
+    qn = connection.ops.quote_name
+
+    selection, params = queryset.values("pk").query.sql_with_params()
+    sql = _VISIBILITY_SQL.format(
+        table=qn(meta.db_table),
+        pk=qn(meta.pk.column),
+        hidden=qn(meta.get_field("is_hidden").column),
+        reason=qn(meta.get_field("hide_reason").column),
+        scope=qn(scope_field.column),
+        selection=selection,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [hidden, reason, *params, hidden, reason])
+        return [
+            (meta.pk.to_python(pk), scope_field.to_python(scope_id))
+            for pk, scope_id in cursor.fetchall()
+        ]
+
+
+def _delete_posts(queryset):
+    rows = list(queryset.select_for_update(of=("self",)).values_list("pk", "community_id"))
+    ids = [pk for pk, _ in rows]
+    if not ids:
+        return rows
+
+    # Children first, each a single DELETE (the ORM cascade would load and
+    # signal every row)
+    comments = Comment.objects.filter(post_id__in=ids)
+    for children in (
+        CommentLike.objects.filter(comment__in=comments.values("pk")),
+        CommentReport.objects.filter(comment__in=comments.values("pk")),
+        comments,
+        PostLike.objects.filter(post_id__in=ids),
+        PostReport.objects.filter(post_id__in=ids),
+        Notification.objects.filter(post_id__in=ids),
+        Post.objects.filter(pk__in=ids),
+    ):
+        children._raw_delete(children.db)
+    return rows
+
+
+def _delete_comments(queryset):
+    # The selection plus every reply below it: a subtree is a path prefix.
+    # Only the selection's posts are scanned (and locked).
+    subtree = Comment.objects.filter(post_id__in=queryset.values("post_id")).filter(Exists(
+        queryset.filter(post_id=OuterRef("post_id"))
+        .annotate(outer_path=ExpressionWrapper(OuterRef("path"), output_field=CharField()))
+        .filter(outer_path__startswith=F("path"))
+    ))
+    rows = list(subtree.select_for_update(of=("self",)).values_list("pk", "post_id", "parent_id"))
+    ids = [pk for pk, _, _ in rows]
+    if not ids:
+        return []
+
+    doomed = Comment.objects.filter(pk__in=ids)
+
+    # comments_count includes replies; surviving parents lose their
+    # removed direct replies
+    per_post = (
+        doomed.filter(post_id=OuterRef("pk"))
+        .values("post_id").annotate(n=Count("pk")).values("n")
+    )
+    Post.objects.filter(pk__in={post_id for _, post_id, _ in rows}).update(
+        comments_count=Greatest(F("comments_count") - Subquery(per_post), 0)
+    )
+    kept_parents = {parent_id for _, _, parent_id in rows if parent_id} - set(ids)
+    if kept_parents:
+        per_parent = (
+            doomed.filter(parent_id=OuterRef("pk"))
+            .values("parent_id").annotate(n=Count("pk")).values("n")
+        )
+        Comment.objects.filter(pk__in=kept_parents).update(
+            replies_count=Greatest(F("replies_count") - Subquery(per_parent), 0)
+        )
+
+    for children in (
+        CommentLike.objects.filter(comment_id__in=ids),
+        CommentReport.objects.filter(comment_id__in=ids),
+        doomed,
+    ):
+        children._raw_delete(children.db)
+    return [(pk, post_id) for pk, post_id, _ in rows]
+
+
+def _refresh(*changes):
+    """
+    Cache refresh for (model, rows, deleted) batches: every community's
+    keys in one Redis round trip, however many rows changed.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for model, rows, deleted in changes:
+        if model is Post:
+            post_ids = {pk for pk, _ in rows}
+            community_ids = {community_id for _, community_id in rows}
+        else:
+            post_ids = {post_id for _, post_id in rows}
+            community_ids = set(
+                Post.objects.filter(pk__in=post_ids).values_list("community_id", flat=True)
+            )
+
+        if model is Post or deleted:
+            # Visibility or comments_count changed
+            post_cache.invalidate(*post_ids)
+            for community_id in community_ids:
+                rankings.invalidate(community_id, pipe)
+                if model is Post:
+                    timeline.invalidate(community_id, pipe)
+                    bump_feed_version(community_id, pipe)
+        etags.bump_posts(post_ids, community_ids, pipe)
+    pipe.execute()
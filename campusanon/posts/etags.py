@@ -0,0 +1,87 @@
+import hashlib
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from campusanon.redis import redis_client
+from . import post_cache
+
+# Content versions, bumped whenever something a response shows changes:
+#   community -> post create / hide / unhide / delete, comment and like counts
+#   post      -> the post itself, its comments, its counters
+#   user      -> the user's own likes and reports (personal flags)
+
+
+def community_version_key(community_id):
+    return f"etag_version:community:{community_id}"
+
+
+def post_version_key(post_id):
+    return f"etag_version:post:{post_id}"
+
+
+def user_version_key(user_id):
+    return f"etag_version:user:{user_id}"
+
+
+def bump_post(post_id, community_id=None):
+    """
+    Bumps a post and the feed of its community.
+    """
+    if community_id is None:
+        entry = post_cache.get_many([post_id]).get(str(post_id))
+        community_id = entry["community_id"] if entry else None
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.incr(post_version_key(post_id))
+    if community_id is not None:
+        pipe.incr(community_version_key(community_id))
+    pipe.execute()
+
+
+def bump_posts(post_ids, community_ids, pipe=None):
+    """
+    bump_post() for many posts in one round trip, each community once.
+    With `pipe` the bumps are only queued on it.
+    """
+    own = pipe is None
+    if own:
+        pipe = redis_client.pipeline(transaction=False)
+    for post_id in post_ids:
+        pipe.incr(post_version_key(post_id))
+    for community_id in set(community_ids):
+        pipe.incr(community_version_key(community_id))
+    if own:
+        pipe.execute()
+
+
+def bump_community(community_id):
+    redis_client.incr(community_version_key(community_id))
+
+
+def bump_user(user_id):
+    redis_client.incr(user_version_key(user_id))
+
+
+def make_etag(user, scope_key, *extra):
+    """
+    Strong ETag over the scope's version, the user's version and any extra
+    request parts (cursor etc.). One MGET, no ORM.
+    """
+    scope_version, user_version = redis_client.mget(scope_key, user_version_key(user.id))
+    raw = ":".join(
+        [scope_key, scope_version or "0", str(user.id), user_version or "0"]
+        + [str(part or "") for part in extra]
+    )
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def not_modified(request, etag):
+    """
+    A 304 Response if the client already has `etag`, otherwise None.
+    """
+    client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in client_etags or "*" in client_etags:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
@@ -0,0 +1,65 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from campusanon.redis import redis_client
+
+# Cached pages only hold user-independent data. Counters inside them may
+# lag by up to this many seconds; visibility changes bump the version.
+FEED_PAGE_TIMEOUT = 30
+
+# Single-flight: only one worker rebuilds a missing page, the rest wait.
+BUILD_LOCK_TIMEOUT = 5
+BUILD_WAIT_STEPS = 10
+BUILD_WAIT_SECONDS = 0.05
+
+
+def feed_version_key(community_id):
+    return f"feed_version:{community_id}"
+
+
+def get_feed_version(community_id):
+    return redis_client.get(feed_version_key(community_id)) or "0"
+
+
+def bump_feed_version(community_id, pipe=None):
+    """
+    Invalidates every cached page of a community at once.
+    Old pages are never deleted, they just stop being addressed and expire.
+    """
+    (pipe or redis_client).incr(feed_version_key(community_id))
+
+
+def feed_page_key(community_id, version, cursor):
+    cursor_part = hashlib.md5(cursor.encode()).hexdigest() if cursor else "first"
+    return f"feed_page:{community_id}:{version}:{cursor_part}"
+
+
+def get_or_build_page(community_id, cursor, build):
+    """
+    Returns the shared page for (community, cursor), calling build() on a miss.
+    Concurrent misses on the same page share a single build().
+    """
+    key = feed_page_key(community_id, get_feed_version(community_id), cursor)
+
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=BUILD_LOCK_TIMEOUT):
+        try:
+            page = build()
+            cache.set(key, page, timeout=FEED_PAGE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return page
+
+    # Someone else is building this page right now
+    for _ in range(BUILD_WAIT_STEPS):
+        time.sleep(BUILD_WAIT_SECONDS)
+        page = cache.get(key)
+        if page is not None:
+            return page
+
+    return build()
@@ -0,0 +1,182 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from campusanon.redis import redis_client
+from .models import Post, PostLike, Notification
+from . import post_cache, etags, rankings, user_flags
+
+logger = logging.getLogger(__name__)
+
+# Write-behind likes (settings.LIKE_WRITE_BEHIND). A toggle only touches
+# Redis; `manage.py flush_like_buffer` writes the result in batches.
+#
+#   like_buffer:{post_id}   hash  user_id -> "1" like / "0" unlike (latest wins)
+#   like_buffer:delta       hash  post_id -> likes_count change not yet in the DB
+#   like_buffer:dirty       set   posts with pending intents
+#
+# Reads merge the buffer (personalize_posts), so users see their own latest
+# state and the optimistic count until the flush lands.
+
+DELTA_KEY = "like_buffer:delta"
+DIRTY_KEY = "like_buffer:dirty"
+
+
+def buffer_key(post_id):
+    return f"like_buffer:{post_id}"
+
+
+def enabled():
+    return settings.LIKE_WRITE_BEHIND
+
+
+# Flips the user's effective state (pending intent, else the DB state passed
+# in) and moves the optimistic delta with it.
+_toggle = redis_client.register_script("""
+local current = redis.call('HGET', KEYS[1], ARGV[1]) or ARGV[3]
+local new = current == '1' and '0' or '1'
+redis.call('HSET', KEYS[1], ARGV[1], new)
+local delta = redis.call('HINCRBY', KEYS[2], ARGV[2], new == '1' and 1 or -1)
+redis.call('SADD', KEYS[3], ARGV[2])
+return {new, delta}
+""")
+
+# Hands a post's intents to the flusher and clears them in one step
+_take = redis_client.register_script("""
+local intents = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('SREM', KEYS[3], ARGV[1])
+return intents
+""")
+
+
+def toggle(user, post_id):
+    """
+    Buffered like toggle. Returns (liked, likes_count) like
+    likes.toggle_post_like, or None if the post doesn't exist.
+    """
+    entry = post_cache.get_many([post_id]).get(str(post_id))
+    if entry is None:
+        return None
+
+    user_id, post_id = str(user.id), str(post_id)
+    liked_in_db = "0"
+    if redis_client.hget(buffer_key(post_id), user_id) is None:
+        if user_flags.lookup(user_id, ("liked",), [post_id])["liked"]:
+            liked_in_db = "1"
+
+    state, delta = _toggle(
+        keys=[buffer_key(post_id), DELTA_KEY, DIRTY_KEY],
+        args=[user_id, post_id, liked_in_db],
+    )
+
+    etags.bump_post(post_id, entry["community_id"])
+    etags.bump_user(user_id)
+    return state == "1", entry["likes_count"] + int(delta)
+
+
+def pending(user_id, post_ids):
+    """
+    ({post_id: liked} for the user's buffered intents, {post_id: delta}),
+    one round trip for a whole page.
+    """
+    post_ids = [str(pk) for pk in post_ids]
+    if not post_ids:
+        return {}, {}
+
+    pipe = redis_client.pipeline(transaction=False)
+    for pk in post_ids:
+        pipe.hget(buffer_key(pk), str(user_id))
+    pipe.hmget(DELTA_KEY, post_ids)
+    *intents, deltas = pipe.execute()
+
+    return (
+        {pk: state == "1" for pk, state in zip(post_ids, intents) if state is not None},
+        {pk: int(delta) for pk, delta in zip(post_ids, deltas) if delta},
+    )
+
+
+def flush():
+    """
+    Writes every buffered post. Returns the number of posts flushed.
+    """
+    flushed = 0
+    for post_id in redis_client.smembers(DIRTY_KEY):
+        raw = _take(keys=[buffer_key(post_id), DELTA_KEY, DIRTY_KEY], args=[post_id])
+        intents = dict(zip(raw[::2], raw[1::2]))
+        if not intents:
+            continue
+        try:
+            _apply(post_id, intents)
+        except Exception:
+            # Put the intents back (newer ones win) for the next run
+            logger.warning("Like buffer flush failed for post %s", post_id, exc_info=True)
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id, state in intents.items():
+                pipe.hsetnx(buffer_key(post_id), user_id, state)
+            pipe.sadd(DIRTY_KEY, post_id)
+            pipe.execute()
+            continue
+        flushed += 1
+    return flushed
+
+
+def _apply(post_id, intents):
+    """
+    Collapsed intents of one post -> one bulk insert, one delete, one
+    counter update and one bulk notification insert.
+    """
+    post = Post.objects.filter(id=post_id).values("user_id", "community_id").first()
+    if post is None:
+        return  # Deleted meanwhile, its likes went with it
+
+    with transaction.atomic():
+        existing = {
+            str(pk) for pk in PostLike.objects.filter(
+                post_id=post_id, user_id__in=list(intents)
+            ).values_list("user_id", flat=True)
+        }
+        added = [u for u, state in intents.items() if state == "1" and u not in existing]
+        removed = [u for u, state in intents.items() if state == "0" and u in existing]
+
+        PostLike.objects.bulk_create(
+            [PostLike(post_id=post_id, user_id=u) for u in added],
+            ignore_conflicts=True,
+        )
+        deleted = 0
+        if removed:
+            # _raw_delete: QuerySet.delete() would send post_delete per row
+            # and the counter receivers would count every unlike again
+            deleted = PostLike.objects.filter(
+                post_id=post_id, user_id__in=removed
+            )._raw_delete(PostLike.objects.db)
+
+        delta = len(added) - deleted
+        if delta:
+            Post.objects.filter(id=post_id).update(likes_count=F("likes_count") + delta)
+
+        # Same rules as notify_on_like: never for liking your own post
+        author_id = str(post["user_id"])
+        notify = [u for u in added if u != author_id]
+        Notification.objects.bulk_create([
+            Notification(recipient_id=author_id, actor_id=u, verb="like", post_id=post_id)
+            for u in notify
+        ])
+
+        def after():
+            post_cache.invalidate(post_id)
+            # Bulk writes send no signals, keep the liked sets in step here
+            for u in added:
+                user_flags.add("liked", u, post_id)
+            for u in removed:
+                user_flags.remove("liked", u, post_id)
+            if delta:
+                rankings.record_engagement(post_id, delta * rankings.LIKE_POINTS)
+            etags.bump_post(post_id, post["community_id"])
+            if notify:
+                cache.set(f"has_notif_{author_id}", True, timeout=86400)
+        transaction.on_commit(after)
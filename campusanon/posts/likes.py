@@ -0,0 +1,121 @@
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from .models import PostLike, CommentLike
+
+# Like toggles without COUNT(*): on Postgres each direction is one statement,
+# the like row and the target's likes_count move together and the new count
+# comes back via RETURNING. Posts and comments share the SQL.
+#
+# The row changes bypass the ORM, so post_save / post_delete are sent by
+# hand afterwards (notifications, rankings, ETags). Those instances carry
+# COUNTED so the counter receivers in signals.py don't count them twice
+# (posts/moderation.py does the same for reports).
+
+COUNTED = "_counter_applied"
+
+_LIKE_SQL = """
+    WITH ins AS (
+        INSERT INTO {like} ({like_user}, {like_target}, {like_created})
+        SELECT %s, t.{target_pk}, NOW() FROM {target} t WHERE t.{target_pk} = %s
+        ON CONFLICT ({like_user}, {like_target}) DO NOTHING
+        RETURNING {like_pk}, {like_created}
+    ), upd AS (
+        UPDATE {target} SET {target_likes} = {target_likes} + 1
+        WHERE {target_pk} = %s AND EXISTS (SELECT 1 FROM ins)
+        RETURNING {target_likes}
+    )
+    SELECT ins.{like_pk}, ins.{like_created}, upd.{target_likes} FROM ins, upd
+"""
+
+_UNLIKE_SQL = """
+    WITH del AS (
+        DELETE FROM {like} WHERE {like_user} = %s AND {like_target} = %s
+        RETURNING {like_pk}
+    )
+    UPDATE {target} SET {target_likes} = {target_likes} - 1
+    WHERE {target_pk} = %s AND EXISTS (SELECT 1 FROM del)
+    RETURNING (SELECT {like_pk} FROM del), {target_likes}
+"""
+
+
+def _sql(template, like_model, target_field):
+    like = like_model._meta
+    target = like.get_field(target_field).related_model._meta
+    qn = connection.ops.quote_name
+    return template.format(
+        like=qn(like.db_table),
+        like_pk=qn(like.pk.column),
+        like_user=qn(like.get_field("user").column),
+        like_target=qn(like.get_field(target_field).column),
+        like_created=qn(like.get_field("created_at").column),
+        target=qn(target.db_table),
+        target_pk=qn(target.pk.column),
+        target_likes=qn(target.get_field("likes_count").column),
+    )
+
+
+def toggle_post_like(user, post_id):
+    """
+    Likes the post, or unlikes it if already liked.
+    Returns (liked, likes_count), or None if the post doesn't exist.
+    """
+    return _toggle(PostLike, "post", user, post_id)
+
+
+def toggle_comment_like(user, comment_id):
+    """
+    Same as toggle_post_like, for comments.
+    """
+    return _toggle(CommentLike, "comment", user, comment_id)
+
+
+def _toggle(like_model, target_field, user, target_id):
+    if connection.vendor != "postgresql":
+        return _toggle_orm(like_model, target_field, user, target_id)
+
+    target_key = f"{target_field}_id"
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_sql(_LIKE_SQL, like_model, target_field), [user.id, target_id, target_id])
+            row = cursor.fetchone()
+            if row:
+                like_id, created_at, likes_count = row
+                like = like_model(id=like_id, user=user, created_at=created_at, **{target_key: target_id})
+                setattr(like, COUNTED, True)
+                post_save.send(sender=like_model, instance=like, created=True, raw=False,
+                               using=connection.alias, update_fields=None)
+                return True, likes_count
+
+            # Already liked (or missing target): remove the like
+            cursor.execute(_sql(_UNLIKE_SQL, like_model, target_field), [user.id, target_id, target_id])
+            row = cursor.fetchone()
+            if row is None:
+                # Missing target, or a parallel toggle removed the like first
+                target_model = like_model._meta.get_field(target_field).related_model
+                likes_count = target_model.objects.filter(pk=target_id).values_list(
+                    "likes_count", flat=True
+                ).first()
+                return None if likes_count is None else (False, likes_count)
+            like_id, likes_count = row
+            like = like_model(id=like_id, user=user, **{target_key: target_id})
+            setattr(like, COUNTED, True)
+            post_delete.send(sender=like_model, instance=like, using=connection.alias,
+                             origin=like)
+            return False, likes_count
+
+
+def _toggle_orm(like_model, target_field, user, target_id):
+    # Other databases (local sqlite): plain ORM, counters via signals
+    target_model = like_model._meta.get_field(target_field).related_model
+    if not target_model.objects.filter(pk=target_id).exists():
+        return None
+
+    with transaction.atomic():
+        like, created = like_model.objects.get_or_create(
+            user=user, **{f"{target_field}_id": target_id}
+        )
+        if not created:
+            like.delete()
+
+    likes_count = target_model.objects.filter(pk=target_id).values_list("likes_count", flat=True).first()
+    return created, likes_count
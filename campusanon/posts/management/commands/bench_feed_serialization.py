@@ -0,0 +1,118 @@
+import time
+import uuid
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.renderers import JSONRenderer
+from accounts.models import User
+from campusanon.renderers import ORJSONRenderer
+from communities.models import Community
+from posts.models import Post
+from posts.post_cache import serialize_post
+from posts.projections import PostRow
+
+PAGE_SIZES = (20, 50, 200)
+
+# The columns each path reads. Fetched once per page: the timed part is
+# building the objects from the database tuples plus serialization.
+POST_FIELDS = [f.attname for f in Post._meta.concrete_fields]
+COMMUNITY_FIELDS = [f.attname for f in Community._meta.concrete_fields]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def model_rows(page):
+    # What select_related("community") reads: every column of both tables
+    return list(page.values_list(*POST_FIELDS, *(f"community__{name}" for name in COMMUNITY_FIELDS)))
+
+
+def model_path(rows):
+    # Previous path: full model instances + DRF's json encoder
+    posts = []
+    for values in rows:
+        post = Post.from_db(DEFAULT_DB_ALIAS, POST_FIELDS, values[:len(POST_FIELDS)])
+        community = Community.from_db(DEFAULT_DB_ALIAS, COMMUNITY_FIELDS, values[len(POST_FIELDS):])
+        Post.community.field.set_cached_value(post, community)
+        posts.append(post)
+
+    data = [
+        {
+            "id": str(p.id),
+            "alias": p.alias,
+            "content": p.content,
+            "post_type": p.post_type,
+            "created_at": p.created_at,
+            "likes_count": p.likes_count,
+            "comments_count": p.comments_count,
+            "community_id": str(p.community_id),
+            "community_name": p.community.name,
+        }
+        for p in posts
+    ]
+    return JSONRenderer().render(data)
+
+
+def projected_rows(page):
+    return list(page.values_list(*PostRow.columns()))
+
+
+def projected_path(rows):
+    data = [serialize_post(PostRow.from_values(values)) for values in rows]
+    return ORJSONRenderer().render(data)
+
+
+class Command(BaseCommand):
+    help = "CPU time per feed page: model instances + DRF json vs projected rows + orjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **kwargs):
+        repeat = kwargs["repeat"]
+        self.stdout.write(
+            f"⏱️  Benchmarking feed pages (rows to JSON), median CPU time of {repeat} runs "
+            "(seed data is rolled back)..."
+        )
+
+        try:
+            with transaction.atomic():
+                community = self._seed(max(PAGE_SIZES))
+                for size in PAGE_SIZES:
+                    page = Post.objects.filter(community=community).order_by("-created_at", "-id")[:size]
+                    before = self._time(model_path, model_rows(page), repeat)
+                    after = self._time(projected_path, projected_rows(page), repeat)
+                    self.stdout.write(
+                        f"{size:>4} posts: models {before:7.2f} ms | "
+                        f"projected {after:7.2f} ms | x{before / after:.1f}"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, count):
+        # bulk_create: no signals, nothing leaks into Redis
+        user = User.objects.create(email_hash=f"bench-{uuid.uuid4().hex}", year=1, branch="BENCH")
+        community = Community.objects.create(name="Bench", slug=f"bench-{uuid.uuid4().hex}")
+        Post.objects.bulk_create([
+            Post(
+                user=user,
+                community=community,
+                alias=f"bench_{i}",
+                content="Lorem ipsum dolor sit amet " * 8,
+                likes_count=i,
+                comments_count=i // 2,
+            )
+            for i in range(count)
+        ])
+        return community
+
+    def _time(self, path, page, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.process_time()
+            path(page)
+            samples.append((time.process_time() - start) * 1000)
+        return median(samples)
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from posts import like_buffer
+
+
+class Command(BaseCommand):
+    help = "Writes buffered likes (LIKE_WRITE_BEHIND) to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running, flushing every INTERVAL seconds",
+        )
+
+    def handle(self, *args, **kwargs):
+        interval = kwargs["interval"]
+        if not interval:
+            total = like_buffer.flush()
+            self.stdout.write(f"🎉 Done! Flushed likes of {total} posts.")
+            return
+
+        self.stdout.write(f"❤️ Flushing buffered likes every {interval}s...")
+        while True:
+            like_buffer.flush()
+            time.sleep(interval)
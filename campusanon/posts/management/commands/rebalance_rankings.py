@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from communities.models import Community
+from posts import rankings, etags
+
+
+class Command(BaseCommand):
+    help = 'Decays "hot" scores and refreshes "top" rankings (run every hour)'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("🔥 Rebalancing feed rankings...")
+
+        total = 0
+        for community_id in Community.objects.values_list("id", flat=True):
+            rankings.decay(community_id)
+            # Ranked pages changed without any post changing
+            etags.bump_community(community_id)
+            total += 1
+
+        self.stdout.write(f"🎉 Done! Rebalanced {total} communities.")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from communities.models import Community
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Repopulates the Redis feed timelines from the Post table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--community",
+            help="Only rebuild this community (UUID)",
+        )
+
+    def handle(self, *args, **options):
+        communities = Community.objects.all()
+        if options["community"]:
+            communities = communities.filter(id=options["community"])
+
+        self.stdout.write("🧱 Rebuilding feed timelines...")
+
+        total = 0
+        for community in communities:
+            count = timeline.rebuild(community.id)
+            if count is None:
+                self.stdout.write(f"   ⏭️ {community.name}: changed while rebuilding, rebuilt on next read")
+                continue
+            total += 1
+            self.stdout.write(f"   ✅ {community.name}: {count} posts")
+
+        self.stdout.write(f"🎉 Done! Rebuilt {total} timelines.")
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:54
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, fk):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{fk: OuterRef("pk")})
+            .order_by()
+            .values(fk)
+            .annotate(c=Count("*"))
+            .values("c"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    PostLike = apps.get_model("posts", "PostLike")
+    PostReport = apps.get_model("posts", "PostReport")
+    CommentLike = apps.get_model("posts", "CommentLike")
+    CommentReport = apps.get_model("posts", "CommentReport")
+
+    Post.objects.update(
+        likes_count=_count(PostLike, "post"),
+        comments_count=_count(Comment, "post"),
+        reports_count=_count(PostReport, "post"),
+    )
+    Comment.objects.update(
+        likes_count=_count(CommentLike, "comment"),
+        reports_count=_count(CommentReport, "comment"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reports_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reports_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0005_community_division_alter_community_unique_together'),
+        ('posts', '0014_engagement_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'is_hidden', 'created_at', 'id'], name='posts_comme_post_id_30c751_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='posts_notif_recipie_c4a0b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', 'is_hidden', '-created_at', '-id'], name='posts_post_communi_b6413b_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:12
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# posts.threads.segment() as of this migration, copied so later changes to
+# the app code can't change what it writes
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def segment(created_at, comment_id):
+    micros = (created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{micros:016d}{comment_id.int % 10 ** 6:06d}"
+
+
+def backfill_paths(apps, schema_editor):
+    # Existing comments are all top-level
+    Comment = apps.get_model("posts", "Comment")
+    batch = []
+    for comment in Comment.objects.only("id", "created_at").iterator(chunk_size=2000):
+        comment.path = segment(comment.created_at, comment.id)
+        batch.append(comment)
+        if len(batch) >= 2000:
+            Comment.objects.bulk_update(batch, ["path"])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ["path"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='posts_comme_post_id_30c751_idx',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', max_length=110),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'depth', 'path'], name='posts_comme_post_id_f45a88_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='posts_comme_post_id_abd11d_idx'),
+        ),
+    ]
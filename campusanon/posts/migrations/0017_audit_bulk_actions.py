@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adminauditlog',
+            name='action',
+            field=models.CharField(choices=[('BAN_USER', 'Ban User'), ('UNBAN_USER', 'Unban User'), ('HIDE_POST', 'Hide Post'), ('UNHIDE_POST', 'Unhide Post'), ('DELETE_POST', 'Delete Post'), ('HIDE_COMMENT', 'Hide Comment'), ('UNHIDE_COMMENT', 'Unhide Comment'), ('DELETE_COMMENT', 'Delete Comment')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0005_community_division_alter_community_unique_together'),
+        ('posts', '0017_audit_bulk_actions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('reports_count__gt', 0)), fields=['-reports_count', '-created_at', '-id'], name='comment_report_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('reports_count__gt', 0)), fields=['-reports_count', '-created_at', '-id'], name='post_report_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('reports_count__gt', 0)), fields=['community', '-reports_count', '-created_at', '-id'], name='post_comm_report_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_report_queue_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['-created_at', '-id'], name='posts_admin_created_0d3a1d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['admin', '-created_at', '-id'], name='posts_admin_admin_i_b0bda3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['action', '-created_at', '-id'], name='posts_admin_action_e963b5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['target_type', '-created_at', '-id'], name='posts_admin_target__e8ee31_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['target_id', '-created_at', '-id'], name='posts_admin_target__aeb038_idx'),
+        ),
+    ]
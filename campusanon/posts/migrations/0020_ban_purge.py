@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_audit_log_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminauditlog',
+            name='details',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='hidden_by_ban',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hidden_by_ban',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:54
+
+from django.db import migrations, models
+
+# Auto-hide threshold when this migration was written (posts/moderation.py)
+REPORT_THRESHOLD = 3
+HIDE_REASONS = [('', 'Reports'), ('admin', 'Admin'), ('ban', 'Ban purge')]
+
+
+def copy_reasons(apps, schema_editor):
+    for name in ("Post", "Comment"):
+        model = apps.get_model("posts", name)
+        model.objects.filter(hidden_by_ban=True).update(hide_reason="ban")
+        # Hidden below the threshold: only an admin can have done that
+        model.objects.filter(
+            is_hidden=True, hidden_by_ban=False, reports_count__lt=REPORT_THRESHOLD
+        ).update(hide_reason="admin")
+
+
+def copy_reasons_back(apps, schema_editor):
+    for name in ("Post", "Comment"):
+        model = apps.get_model("posts", name)
+        model.objects.filter(hide_reason="ban").update(hidden_by_ban=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_ban_purge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='hide_reason',
+            field=models.CharField(blank=True, choices=HIDE_REASONS, default='', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hide_reason',
+            field=models.CharField(blank=True, choices=HIDE_REASONS, default='', max_length=8),
+        ),
+        migrations.RunPython(copy_reasons, copy_reasons_back),
+        migrations.RemoveField(
+            model_name='comment',
+            name='hidden_by_ban',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='hidden_by_ban',
+        ),
+    ]
@@ -1,7 +1,15 @@
 import uuid
 from django.db import models
+from django.db.models import Q
 from accounts.models import User
 from communities.models import Community
+from .threads import PATH_LENGTH
+
+# Why a post / comment was hidden by hand. Empty: visibility follows the
+# report count, withdrawn reports can bring it back (posts/moderation.py).
+HIDE_ADMIN = "admin"
+HIDE_BAN = "ban"  # ban purge, restored on unban (posts/bulk_moderation.py)
+HIDE_REASONS = [("", "Reports"), (HIDE_ADMIN, "Admin"), (HIDE_BAN, "Ban purge")]
 
 
 class Post(models.Model):
@@ -28,8 +36,30 @@ class Post(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     is_hidden = models.BooleanField(default=False)
+    hide_reason = models.CharField(max_length=8, choices=HIDE_REASONS, blank=True, default="")
+
+    # ⚡ Denormalized counters (kept in sync by posts/signals.py)
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    reports_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination for community feeds
+            models.Index(fields=["community", "is_hidden", "-created_at", "-id"]),
+            # Moderation queue: only reported posts are indexed
+            models.Index(
+                fields=["-reports_count", "-created_at", "-id"],
+                condition=Q(reports_count__gt=0),
+                name="post_report_queue_idx",
+            ),
+            models.Index(
+                fields=["community", "-reports_count", "-created_at", "-id"],
+                condition=Q(reports_count__gt=0),
+                name="post_comm_report_queue_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.alias} in {self.community.name}"
@@ -47,9 +77,34 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     is_hidden = models.BooleanField(default=False)
+    hide_reason = models.CharField(max_length=8, choices=HIDE_REASONS, blank=True, default="")
+
+    # 🧵 Replies (materialized path, see posts/threads.py)
+    parent = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.CASCADE, related_name="replies"
+    )
+    path = models.CharField(max_length=PATH_LENGTH, default="")
+    depth = models.PositiveSmallIntegerField(default=0)
+
+    # ⚡ Denormalized counters (kept in sync by posts/signals.py)
+    likes_count = models.PositiveIntegerField(default=0)
+    reports_count = models.PositiveIntegerField(default=0)
+    replies_count = models.PositiveIntegerField(default=0)  # direct replies
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # Top-level comment pages and feed previews
+            models.Index(fields=["post", "depth", "path"]),
+            # Subtree range scans (reply previews, "load more replies")
+            models.Index(fields=["post", "path"]),
+            # Moderation queue
+            models.Index(
+                fields=["-reports_count", "-created_at", "-id"],
+                condition=Q(reports_count__gt=0),
+                name="comment_report_queue_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.alias} on {self.post.id}"
@@ -103,8 +158,12 @@ class AdminAuditLog(models.Model):
     ACTION_CHOICES = [
         ("BAN_USER", "Ban User"),
         ("UNBAN_USER", "Unban User"),
+        ("HIDE_POST", "Hide Post"),
         ("UNHIDE_POST", "Unhide Post"),
+        ("DELETE_POST", "Delete Post"),
+        ("HIDE_COMMENT", "Hide Comment"),
         ("UNHIDE_COMMENT", "Unhide Comment"),
+        ("DELETE_COMMENT", "Delete Comment"),
     ]
 
     admin = models.ForeignKey(
@@ -119,10 +178,20 @@ class AdminAuditLog(models.Model):
     target_type = models.CharField(max_length=30)
 
     reason = models.CharField(max_length=255, blank=True)
+    # Structured extras, e.g. affected counts of a ban purge
+    details = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination of the audit log, unfiltered and per filter
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["admin", "-created_at", "-id"]),
+            models.Index(fields=["action", "-created_at", "-id"]),
+            models.Index(fields=["target_type", "-created_at", "-id"]),
+            models.Index(fields=["target_id", "-created_at", "-id"]),
+        ]
 
     def __str__(self):
         return f"{self.admin_id} → {self.action} ({self.target_type})"
@@ -165,6 +234,10 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination for the notification list
+            models.Index(fields=["recipient", "-created_at", "-id"]),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient}: {self.actor.internal_username} {self.verb}"
\ No newline at end of file
@@ -0,0 +1,170 @@
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from .models import Post, Comment, PostReport, CommentReport
+from .likes import COUNTED
+
+# Auto-hide: a post / comment is hidden once its stored reports_count
+# reaches the threshold and unhidden when withdrawn reports take it back
+# below. Everything keys off the counter, report rows are never counted.
+# Content hidden by hand (hide_reason: admin, ban purge) stays hidden
+# whatever the count: only an admin or unbanning brings it back.
+REPORT_THRESHOLD = 3
+COMMENT_REPORT_THRESHOLD = 3
+
+# target -> (report model, report FK, threshold, columns the post_save
+# receivers need when visibility changes: feed indexes, ETags)
+TARGETS = {
+    Post: (PostReport, "post", REPORT_THRESHOLD,
+           ("community_id", "created_at", "likes_count", "comments_count")),
+    Comment: (CommentReport, "comment", COMMENT_REPORT_THRESHOLD, ("post_id",)),
+}
+
+# Insert the report, bump the counter and apply the threshold in one
+# statement. Hidden targets take no new reports.
+_REPORT_SQL = """
+    WITH ins AS (
+        INSERT INTO {report} ({report_target}, {report_user}, {report_reason}, {report_created})
+        SELECT t.{pk}, %s, %s, NOW() FROM {target} t
+        WHERE t.{pk} = %s AND NOT t.{hidden}
+        ON CONFLICT ({report_target}, {report_user}) DO NOTHING
+        RETURNING {report_pk}, {report_created}
+    )
+    UPDATE {target} SET
+        {count} = {count} + 1,
+        {hidden} = {hidden} OR {count} + 1 >= %s
+    WHERE {pk} = %s AND EXISTS (SELECT 1 FROM ins)
+    RETURNING (SELECT {report_pk} FROM ins), (SELECT {report_created} FROM ins),
+        {count}, {hidden}, {extra}
+"""
+
+# Counter change for reports written / removed through the ORM (admin,
+# cascades). Returns the visibility before and after.
+_ADJUST_SQL = """
+    UPDATE {target} t SET
+        {count} = GREATEST(t.{count} + %s, 0),
+        {hidden} = {rule}
+    FROM (SELECT {pk}, {hidden} FROM {target} WHERE {pk} = %s FOR UPDATE) old
+    WHERE t.{pk} = old.{pk}
+    RETURNING old.{hidden}, t.{hidden}, {extra_t}
+"""
+_HIDE_RULE = "t.{hidden} OR t.{count} + 1 >= %s"
+_UNHIDE_RULE = "t.{hidden} AND (t.{reason} <> '' OR t.{count} - 1 >= %s)"
+
+
+def _sql(template, model, **more):
+    report_model, fk, _, extra = TARGETS[model]
+    target, report = model._meta, report_model._meta
+    qn = connection.ops.quote_name
+    names = dict(
+        target=qn(target.db_table),
+        pk=qn(target.pk.column),
+        count=qn(target.get_field("reports_count").column),
+        hidden=qn(target.get_field("is_hidden").column),
+        reason=qn(target.get_field("hide_reason").column),
+        extra=", ".join(qn(target.get_field(f).column) for f in extra),
+        extra_t=", ".join("t." + qn(target.get_field(f).column) for f in extra),
+        report=qn(report.db_table),
+        report_pk=qn(report.pk.column),
+        report_target=qn(report.get_field(fk).column),
+        report_user=qn(report.get_field("reporter").column),
+        report_reason=qn(report.get_field("reason").column),
+        report_created=qn(report.get_field("created_at").column),
+    )
+    names.update({k: v.format(**names) for k, v in more.items()})
+    return template.format(**names)
+
+
+def _visibility_changed(model, pk, hidden, extra_values):
+    # The row changed outside the ORM: let the post_save receivers re-sync
+    # feeds, caches and ETags as for a regular save(update_fields=...)
+    _, _, _, extra = TARGETS[model]
+    instance = model(pk=pk, is_hidden=hidden, **dict(zip(extra, extra_values)))
+    post_save.send(
+        sender=model, instance=instance, created=False, raw=False,
+        using=connection.alias, update_fields=frozenset({"reports_count", "is_hidden"}),
+    )
+
+
+def report(model, user, target_id, reason):
+    """
+    Reports a post or comment. Returns (created, reports_count, is_hidden),
+    or None if the target doesn't exist.
+    """
+    report_model, fk, threshold, _ = TARGETS[model]
+    if connection.vendor != "postgresql":
+        return _report_orm(model, user, target_id, reason)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_sql(_REPORT_SQL, model), [user.id, reason, target_id, threshold, target_id])
+            row = cursor.fetchone()
+
+        if row is None:
+            # Nothing inserted: missing, hidden or already reported
+            state = model.objects.filter(pk=target_id).values_list("reports_count", "is_hidden").first()
+            return None if state is None else (False, *state)
+
+        report_id, created_at, reports_count, hidden, *extra_values = row
+        instance = report_model(
+            id=report_id, reporter=user, reason=reason, created_at=created_at,
+            **{f"{fk}_id": target_id}
+        )
+        setattr(instance, COUNTED, True)
+        post_save.send(sender=report_model, instance=instance, created=True, raw=False,
+                       using=connection.alias, update_fields=None)
+        if hidden:
+            _visibility_changed(model, target_id, True, extra_values)
+        return True, reports_count, hidden
+
+
+def _report_orm(model, user, target_id, reason):
+    # Other databases (local sqlite): the counter receivers call adjust()
+    report_model, fk, _, _ = TARGETS[model]
+    state = model.objects.filter(pk=target_id).values_list("reports_count", "is_hidden").first()
+    if state is None:
+        return None
+    if state[1]:
+        return (False, *state)
+
+    with transaction.atomic():
+        _, created = report_model.objects.get_or_create(
+            reporter=user, defaults={"reason": reason}, **{f"{fk}_id": target_id}
+        )
+    state = model.objects.filter(pk=target_id).values_list("reports_count", "is_hidden").first()
+    return (created, *state)
+
+
+def adjust(model, pk, delta):
+    """
+    Moves reports_count by +1 / -1 and applies the threshold in the same
+    UPDATE: hide when it is reached, unhide when it drops below.
+    """
+    _, _, threshold, _ = TARGETS[model]
+    if connection.vendor != "postgresql":
+        return _adjust_orm(model, pk, delta, threshold)
+
+    rule = _HIDE_RULE if delta > 0 else _UNHIDE_RULE
+    with connection.cursor() as cursor:
+        cursor.execute(_sql(_ADJUST_SQL, model, rule=rule), [delta, threshold, pk])
+        row = cursor.fetchone()
+    if row is None:
+        return
+
+    was_hidden, hidden, *extra_values = row
+    if hidden != was_hidden:
+        _visibility_changed(model, pk, hidden, extra_values)
+
+
+def _adjust_orm(model, pk, delta, threshold):
+    with transaction.atomic():
+        obj = model.objects.select_for_update().filter(pk=pk).first()
+        if obj is None:
+            return
+        was_hidden = obj.is_hidden
+        obj.reports_count = max(obj.reports_count + delta, 0)
+        if delta > 0:
+            obj.is_hidden = was_hidden or obj.reports_count >= threshold
+        else:
+            obj.is_hidden = was_hidden and (bool(obj.hide_reason) or obj.reports_count >= threshold)
+        fields = ["reports_count"] if obj.is_hidden == was_hidden else ["reports_count", "is_hidden"]
+        obj.save(update_fields=fields)
@@ -0,0 +1,126 @@
+from django.core import signing
+from django.db import models
+from django.db.models import F, Func, Value
+
+from .projections import project
+
+CURSOR_SALT = "posts.pagination.cursor"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class RowValue(Func):
+    """
+    SQL row-value constructor: (a, b, ...).
+    Lets us write (created_at, id) < (%s, %s), which Postgres answers
+    with a single index range scan instead of an OR of two ranges.
+    """
+    function = ""
+    template = "(%(expressions)s)"
+    output_field = models.Field()
+
+
+def encode_cursor(values):
+    """
+    Signs the key values of the last row into an opaque, URL-safe token.
+    """
+    return signing.dumps(
+        [v.isoformat() if hasattr(v, "isoformat") else str(v) for v in values],
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(token):
+    try:
+        return signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise InvalidCursor(token)
+
+
+class KeysetPaginator:
+    """
+    Keyset pagination over a fixed sort key, e.g. ("-created_at", "-id").
+
+    Every key column must sort in the same direction so the page boundary
+    can be expressed as one row-value comparison. The last column must be
+    unique (the primary key) so rows sharing a timestamp are never skipped
+    or repeated.
+    """
+
+    def __init__(self, ordering, page_size):
+        descending = {f.startswith("-") for f in ordering}
+        if len(descending) != 1:
+            raise ValueError("Keyset ordering must use a single direction")
+
+        self.ordering = list(ordering)
+        self.fields = [f.lstrip("-") for f in ordering]
+        self.descending = descending.pop()
+        self.page_size = page_size
+
+    def _key_of(self, row):
+        if isinstance(row, dict):
+            return [row[f] for f in self.fields]
+        return [getattr(row, f) for f in self.fields]
+
+    def parse_cursor(self, model, cursor):
+        """
+        Decodes a cursor into typed key values for `model`, or None.
+        """
+        if not cursor:
+            return None
+
+        raw = decode_cursor(cursor)
+        if not isinstance(raw, list) or len(raw) != len(self.fields):
+            raise InvalidCursor(cursor)
+
+        values = []
+        for name, value in zip(self.fields, raw):
+            try:
+                values.append(model._meta.get_field(name).to_python(value))
+            except Exception:
+                raise InvalidCursor(cursor)
+        return values
+
+    def cursor_for(self, values):
+        return encode_cursor(values)
+
+    def filter(self, queryset, cursor):
+        """
+        Applies the cursor boundary and ordering without slicing.
+        """
+        return self.after(queryset, self.parse_cursor(queryset.model, cursor))
+
+    def after(self, queryset, values):
+        """
+        Same as filter() but takes already-decoded key values (or None).
+        """
+        queryset = queryset.order_by(*self.ordering)
+        if values is None:
+            return queryset
+
+        meta = queryset.model._meta
+        lookup = "lt" if self.descending else "gt"
+        return queryset.alias(
+            _keyset=RowValue(*[F(f) for f in self.fields])
+        ).filter(**{f"_keyset__{lookup}": RowValue(*[
+            Value(v, output_field=meta.get_field(f)) for f, v in zip(self.fields, values)
+        ])})
+
+    def paginate(self, queryset, cursor=None, row_class=None):
+        """
+        Returns (rows, next_cursor). next_cursor is None on the last page.
+        With `row_class` (posts/projections.py) rows are projected tuples
+        instead of model instances.
+        """
+        page = self.filter(queryset, cursor)[:self.page_size + 1]
+        rows = project(page, row_class) if row_class else list(page)
+
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            next_cursor = self.cursor_for(self._key_of(rows[-1]))
+
+        return rows, next_cursor
@@ -0,0 +1,33 @@
+from .post_cache import INTERNAL_FIELDS
+from . import like_buffer, user_flags
+
+
+def personalize_posts(items, user):
+    """
+    Adds is_liked / is_reported / is_mine to shared (user-independent) post
+    dicts. The flags of the whole page come from the user's Redis sets in
+    one round trip (posts/user_flags.py).
+
+    Items carry the author in "user_id"; it is consumed here and never
+    returned, posts are anonymous. Other INTERNAL_FIELDS are dropped too.
+    In write-behind mode buffered likes are merged in (posts/like_buffer.py).
+    """
+    ids = [item["id"] for item in items]
+
+    flags = user_flags.lookup(user.id, ("liked", "reported"), ids)
+    liked, reported = flags["liked"], flags["reported"]
+
+    intents, deltas = {}, {}
+    if ids and like_buffer.enabled():
+        intents, deltas = like_buffer.pending(user.id, ids)
+
+    results = []
+    for item in items:
+        data = {k: v for k, v in item.items() if k not in INTERNAL_FIELDS}
+        data["is_liked"] = intents.get(item["id"], item["id"] in liked)
+        if item["id"] in deltas:
+            data["likes_count"] = max(0, data["likes_count"] + deltas[item["id"]])
+        data["is_mine"] = item["user_id"] == str(user.id)
+        data["is_reported"] = item["id"] in reported
+        results.append(data)
+    return results
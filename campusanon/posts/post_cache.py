@@ -0,0 +1,100 @@
+import uuid
+
+from django.core.cache import cache
+from .models import Post
+from .projections import PostRow, project
+
+# Entries are dropped on hide / unhide / delete / counter change, the
+# timeout only bounds memory for posts nobody reads anymore.
+POST_CACHE_TIMEOUT = 60 * 60
+
+# invalidate() also gives the post a new generation token, and entries
+# remember the token they were loaded under: a slow refill that read the
+# row before a change can still write, but its entry is never served.
+# Generations outlive entries, so an expired one can't match an old entry.
+GENERATION_TIMEOUT = 2 * POST_CACHE_TIMEOUT
+
+# Present in cached entries for server-side use, never sent to clients
+INTERNAL_FIELDS = ("user_id", "is_hidden")
+
+
+def post_key(post_id):
+    return f"post:{post_id}"
+
+
+def generation_key(post_id):
+    return f"post_gen:{post_id}"
+
+
+def serialize_post(post):
+    """
+    The shared (user-independent) shape of a post, from a PostRow.
+    """
+    return {
+        "id": str(post.id),
+        "user_id": str(post.user_id),
+        "is_hidden": post.is_hidden,
+        "alias": post.alias,
+        "content": post.content,
+        "post_type": post.post_type,
+        "created_at": post.created_at,
+        "likes_count": post.likes_count,
+        "comments_count": post.comments_count,
+        "community_id": str(post.community_id),
+        "community_name": post.community_name,
+    }
+
+
+def get_many(ids):
+    """
+    Returns {post_id: entry} for the given IDs: one MGET (entries and
+    generations), then one SQL query for the misses. Unknown IDs are
+    simply absent.
+    """
+    ids = [str(pk) for pk in ids]
+    if not ids:
+        return {}
+
+    cached = cache.get_many([key for pk in ids for key in (post_key(pk), generation_key(pk))])
+    found, generations = {}, {}
+    for pk in ids:
+        generation = cached.get(generation_key(pk))
+        entry = cached.get(post_key(pk))
+        # (generation, data); anything else predates generations
+        if isinstance(entry, tuple) and entry[0] == generation:
+            found[pk] = entry[1]
+        else:
+            generations[pk] = generation
+
+    if generations:
+        fresh = {
+            str(p.id): serialize_post(p)
+            for p in project(Post.objects.filter(id__in=list(generations)), PostRow)
+        }
+        cache.set_many(
+            {post_key(pk): (generations[pk], entry) for pk, entry in fresh.items()},
+            timeout=POST_CACHE_TIMEOUT,
+        )
+        found.update(fresh)
+
+    return found
+
+
+def hydrate(ids, include_hidden=False):
+    """
+    Entries for `ids` in the same order, skipping missing (and hidden) posts.
+    """
+    entries = get_many(ids)
+    results = []
+    for pk in ids:
+        entry = entries.get(str(pk))
+        if entry is None or (entry["is_hidden"] and not include_hidden):
+            continue
+        results.append(entry)
+    return results
+
+
+def invalidate(*post_ids):
+    generation = uuid.uuid4().hex
+    cache.set_many({generation_key(pk): generation for pk in post_ids}, timeout=GENERATION_TIMEOUT)
+    cache.delete_many([post_key(pk) for pk in post_ids])
@@ -0,0 +1,73 @@
+"""
+Model-free read path for list endpoints: fetch only the needed columns as
+values_list tuples and wrap them in __slots__ rows instead of building
+full model instances.
+"""
+
+
+class Row:
+    """
+    Lightweight read-only row. Subclasses list their attributes in
+    __slots__; `lookups` maps an attribute to an ORM path when the two
+    differ (e.g. "community_name": "community__name").
+    """
+    __slots__ = ()
+    lookups = {}
+
+    @classmethod
+    def columns(cls):
+        return [cls.lookups.get(name, name) for name in cls.__slots__]
+
+    @classmethod
+    def from_values(cls, values):
+        row = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, values):
+            setattr(row, name, value)
+        return row
+
+
+def project(queryset, row_class):
+    """
+    Evaluates `queryset` as row_class instances, one tuple per row.
+    """
+    return [row_class.from_values(values) for values in queryset.values_list(*row_class.columns())]
+
+
+class PostRow(Row):
+    __slots__ = (
+        "id", "user_id", "is_hidden", "alias", "content", "post_type",
+        "created_at", "likes_count", "comments_count",
+        "community_id", "community_name",
+    )
+    lookups = {"community_name": "community__name"}
+
+
+class CommentRow(Row):
+    __slots__ = (
+        "id", "post_id", "user_id", "alias", "content", "created_at",
+        "likes_count", "parent_id", "depth", "path", "replies_count",
+    )
+
+
+class QueuedPostRow(Row):
+    __slots__ = (
+        "id", "reports_count", "created_at", "is_hidden",
+        "user_id", "alias", "content", "community_id",
+    )
+
+
+class QueuedCommentRow(Row):
+    __slots__ = (
+        "id", "reports_count", "created_at", "is_hidden",
+        "user_id", "alias", "content", "community_id", "post_id",
+    )
+    lookups = {"community_id": "post__community_id"}
+
+
+class AuditLogRow(Row):
+    __slots__ = ("id", "admin_id", "action", "target_type", "target_id", "reason", "details", "created_at")
+
+
+class NotificationRow(Row):
+    __slots__ = ("id", "actor_alias", "verb", "post_id", "is_read", "created_at")
+    lookups = {"actor_alias": "actor__internal_username"}
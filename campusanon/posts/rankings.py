@@ -0,0 +1,184 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from campusanon.redis import redis_client, write_if_unchanged
+from .models import Post
+from . import post_cache
+
+# Same weights as the community leaderboard
+POST_POINTS = 5
+LIKE_POINTS = 2
+COMMENT_POINTS = 8
+
+# hot: engagement points, decayed by rebalance_rankings (run it every
+# DECAY_INTERVAL). top_*: raw points of posts created inside the window.
+MODES = ("hot", "top_day", "top_week")
+WINDOWS = {
+    "hot": timedelta(days=7),
+    "top_day": timedelta(days=1),
+    "top_week": timedelta(days=7),
+}
+HOT_DECAY = 0.8
+DECAY_INTERVAL = timedelta(hours=1)
+
+# Members kept per ranking
+RANK_SIZE = 1000
+
+# Posts entering / leaving bump rank_gen:{community}, cold or not, and
+# rebuild() only stores a result computed under an unchanged generation
+# (see posts/timeline.py). Engagement doesn't: a like racing a rebuild
+# costs a few points, not a post.
+
+
+def rank_key(mode, community_id):
+    return f"rank:{mode}:{community_id}"
+
+
+def state_key(community_id):
+    return f"rank_state:{community_id}"
+
+
+def generation_key(community_id):
+    return f"rank_gen:{community_id}"
+
+
+def points(likes_count, comments_count):
+    return POST_POINTS + LIKE_POINTS * likes_count + COMMENT_POINTS * comments_count
+
+
+def _scores(post, now):
+    """
+    Ranking scores of a post as if it had been tracked since creation.
+    """
+    base = points(post.likes_count, post.comments_count)
+    age = now - post.created_at
+
+    scores = {}
+    for mode in MODES:
+        if age > WINDOWS[mode]:
+            continue
+        if mode == "hot":
+            scores[mode] = base * HOT_DECAY ** (age / DECAY_INTERVAL)
+        else:
+            scores[mode] = base
+    return scores
+
+
+def rebuild(community_id, modes=MODES):
+    """
+    Recomputes rankings of a community from the stored counters.
+    Only posts inside the widest window are read. Returns {mode: {post_id:
+    score}}, stored unless a post changed meanwhile.
+    """
+    generation = redis_client.get(generation_key(community_id))
+    now = timezone.now()
+    widest = max(WINDOWS[mode] for mode in modes)
+    posts = Post.objects.filter(
+        community_id=community_id,
+        is_hidden=False,
+        created_at__gte=now - widest,
+    ).only("id", "created_at", "likes_count", "comments_count")
+
+    members = {mode: {} for mode in modes}
+    for post in posts:
+        for mode, score in _scores(post, now).items():
+            if mode in members:
+                members[mode][str(post.id)] = score
+
+    def write(pipe):
+        for mode, mapping in members.items():
+            key = rank_key(mode, community_id)
+            pipe.delete(key)
+            if mapping:
+                pipe.zadd(key, mapping)
+                pipe.zremrangebyrank(key, 0, -(RANK_SIZE + 1))
+        pipe.set(state_key(community_id), 1)
+
+    write_if_unchanged(generation_key(community_id), generation, write)
+    return members
+
+
+def decay(community_id):
+    """
+    Periodic rebalancing: ages hot scores, drops posts that left the top
+    windows. Cost is one community's last week of posts.
+    """
+    key = rank_key("hot", community_id)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zunionstore(key, {key: HOT_DECAY})
+    pipe.zremrangebyrank(key, 0, -(RANK_SIZE + 1))
+    pipe.execute()
+    rebuild(community_id, modes=("top_day", "top_week"))
+
+
+def add_post(post):
+    """
+    Create / unhide. Cold rankings are left alone, rebuild() picks it up.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.incr(generation_key(post.community_id))
+    pipe.exists(state_key(post.community_id))
+    if not pipe.execute()[1]:
+        return
+
+    pipe = redis_client.pipeline(transaction=False)
+    for mode, score in _scores(post, timezone.now()).items():
+        pipe.zadd(rank_key(mode, post.community_id), {str(post.id): score})
+    pipe.execute()
+
+
+def remove_post(post):
+    """
+    Hide / delete.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.incr(generation_key(post.community_id))
+    for mode in MODES:
+        pipe.zrem(rank_key(mode, post.community_id), str(post.id))
+    pipe.execute()
+
+
+def record_engagement(post_id, delta):
+    """
+    Adds `delta` points to a post in every ranking it is currently part of.
+    ZADD XX INCR never re-adds posts that aged out or were hidden.
+    """
+    entry = post_cache.get_many([post_id]).get(str(post_id))
+    if entry is None:
+        return
+
+    pipe = redis_client.pipeline(transaction=False)
+    for mode in MODES:
+        pipe.zadd(
+            rank_key(mode, entry["community_id"]),
+            {str(post_id): delta},
+            xx=True,
+            incr=True,
+        )
+    pipe.execute()
+
+
+def invalidate(community_id, pipe=None):
+    """
+    Drops a community's rankings after set-based changes, read_page()
+    rebuilds them. Queued on `pipe` when given.
+    """
+    keys = [state_key(community_id), *(rank_key(mode, community_id) for mode in MODES)]
+    pipe = pipe or redis_client
+    pipe.incr(generation_key(community_id))
+    pipe.delete(*keys)
+
+
+def read_page(mode, community_id, offset, limit):
+    """
+    Post IDs ranked `offset`..`offset + limit - 1`, best first.
+    Cold rankings are rebuilt first.
+    """
+    if not redis_client.exists(state_key(community_id)):
+        # From the rebuild itself, which isn't stored if it raced a change.
+        # Same order as ZREVRANGE: score, then member, descending.
+        scores = rebuild(community_id)[mode]
+        ranked = sorted(scores, key=lambda pk: (scores[pk], pk), reverse=True)[:RANK_SIZE]
+        return ranked[offset:offset + limit]
+    return redis_client.zrevrange(rank_key(mode, community_id), offset, offset + limit - 1)
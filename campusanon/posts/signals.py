@@ -1,33 +1,310 @@
-from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from .models import PostReport, CommentReport, PostLike, Comment, Notification # ✅ Import Notification
+from .models import Post, PostReport, CommentReport, PostLike, CommentLike, Comment, Notification # ✅ Import Notification
 from django.core.cache import cache
-# We match the thresholds from your views.py
-REPORT_THRESHOLD = 3
-COMMENT_REPORT_THRESHOLD = 3
+from .feed_cache import bump_feed_version
+from . import timeline, post_cache, etags, rankings, likes, user_flags, moderation
+
+# -------------------------------
+# 🗂️ FEED INDEXES (timeline + rankings + page cache)
+# -------------------------------
+# Create / hide / unhide / delete change which posts a feed page shows.
+# Counter-only updates go through QuerySet.update() and don't land here,
+# _bump() drops the post cache entry for those.
+
+def _sync_feed(post, created):
+    if not created:
+        post_cache.invalidate(post.id)
+    if post.is_hidden:
+        timeline.remove_post(post)
+        rankings.remove_post(post)
+    else:
+        timeline.add_post(post)
+        rankings.add_post(post)
+    bump_feed_version(post.community_id)
+
+
+@receiver(post_save, sender=Post)
+def sync_feed_on_post_save(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or "is_hidden" in update_fields:
+        transaction.on_commit(lambda: _sync_feed(instance, created))
+    else:
+        transaction.on_commit(lambda: post_cache.invalidate(instance.id))
+
+@receiver(post_delete, sender=Post)
+def sync_feed_on_post_delete(sender, instance, **kwargs):
+    def sync():
+        post_cache.invalidate(instance.id)
+        timeline.remove_post(instance)
+        rankings.remove_post(instance)
+        bump_feed_version(instance.community_id)
+    transaction.on_commit(sync)
+
+
+# -------------------------------
+# 🧹 CASCADES
+# -------------------------------
+# Deleting a post (or comment, or user) collects its likes, reports and
+# replies and sends post_delete for each of them. Bumping counters or
+# caches of a parent that is deleted in the same operation is wasted work,
+# one query per child. The Collector sends pre_delete for every row before
+# any post_delete, so parents mark themselves on the delete's `origin` and
+# the child receivers below skip them. The mark lives and dies with origin.
+
+DELETING = "_deleting_rows"
+
+
+@receiver(pre_delete, sender=Post)
+@receiver(pre_delete, sender=Comment)
+def mark_deleting(sender, instance, origin=None, **kwargs):
+    if origin is None:
+        return
+    if not hasattr(origin, DELETING):
+        setattr(origin, DELETING, {Post: set(), Comment: set()})
+    getattr(origin, DELETING)[sender].add(instance.pk)
+
+
+def _deleting(model, pk, origin):
+    """
+    True if `pk` of `model` goes away in the delete started by `origin`.
+    """
+    return pk in getattr(origin, DELETING, {}).get(model, ())
+
+
+# -------------------------------
+# ⚡ DENORMALIZED COUNTERS
+# -------------------------------
+# These run inside the caller's transaction, so the counter moves together
+# with the row that was inserted/deleted. F() keeps concurrent updates safe.
+
+def _bump(model, pk, field, delta):
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+    if model is Post:
+        transaction.on_commit(lambda: post_cache.invalidate(pk))
+
+
+def _count_like(like, model, pk, delta):
+    # The like toggles (posts/likes.py) move the counter in their own statement
+    if not getattr(like, likes.COUNTED, False):
+        _bump(model, pk, "likes_count", delta)
+    elif model is Post:
+        transaction.on_commit(lambda: post_cache.invalidate(pk))
+
+
+@receiver(post_save, sender=PostLike)
+def count_post_like(sender, instance, created, **kwargs):
+    if created:
+        _count_like(instance, Post, instance.post_id, 1)
+
+@receiver(post_delete, sender=PostLike)
+def uncount_post_like(sender, instance, origin=None, **kwargs):
+    if not _deleting(Post, instance.post_id, origin):
+        _count_like(instance, Post, instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        # comments_count includes replies: no tree walk for the post total
+        _bump(Post, instance.post_id, "comments_count", 1)
+        if instance.parent_id:
+            _bump(Comment, instance.parent_id, "replies_count", 1)
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, origin=None, **kwargs):
+    if not _deleting(Post, instance.post_id, origin):
+        _bump(Post, instance.post_id, "comments_count", -1)
+    if instance.parent_id and not _deleting(Comment, instance.parent_id, origin):
+        _bump(Comment, instance.parent_id, "replies_count", -1)
+
+
+# Report counters also drive auto-hide / auto-unhide (posts/moderation.py):
+# one conditional UPDATE, no report counting.
+
+@receiver(post_save, sender=PostReport)
+def count_post_report(sender, instance, created, **kwargs):
+    if created and not getattr(instance, likes.COUNTED, False):
+        moderation.adjust(Post, instance.post_id, 1)
 
 @receiver(post_delete, sender=PostReport)
-def check_post_reports_on_delete(sender, instance, **kwargs):
-    post = instance.post
-    # Count remaining reports
-    count = post.reports.count()
-    
-    # If it was hidden but now has fewer reports than threshold, unhide it
-    if post.is_hidden and count < REPORT_THRESHOLD:
-        post.is_hidden = False
-        post.save()
-        print(f"✅ Auto-unhidden Post {post.alias} (Reports dropped to {count})")
+def uncount_post_report(sender, instance, origin=None, **kwargs):
+    if not _deleting(Post, instance.post_id, origin):
+        moderation.adjust(Post, instance.post_id, -1)
+
+
+@receiver(post_save, sender=CommentLike)
+def count_comment_like(sender, instance, created, **kwargs):
+    if created:
+        _count_like(instance, Comment, instance.comment_id, 1)
+
+@receiver(post_delete, sender=CommentLike)
+def uncount_comment_like(sender, instance, origin=None, **kwargs):
+    if not _deleting(Comment, instance.comment_id, origin):
+        _count_like(instance, Comment, instance.comment_id, -1)
+
+
+@receiver(post_save, sender=CommentReport)
+def count_comment_report(sender, instance, created, **kwargs):
+    if created and not getattr(instance, likes.COUNTED, False):
+        moderation.adjust(Comment, instance.comment_id, 1)
 
 @receiver(post_delete, sender=CommentReport)
-def check_comment_reports_on_delete(sender, instance, **kwargs):
-    comment = instance.comment
-    count = comment.reports.count()
-    
-    if comment.is_hidden and count < COMMENT_REPORT_THRESHOLD:
-        comment.is_hidden = False
-        comment.save()
-        print(f"✅ Auto-unhidden Comment {comment.alias} (Reports dropped to {count})")
+def uncount_comment_report(sender, instance, origin=None, **kwargs):
+    if not _deleting(Comment, instance.comment_id, origin):
+        moderation.adjust(Comment, instance.comment_id, -1)
+
+
+# -------------------------------
+# 🔥 RANKINGS (hot / top, see posts/rankings.py)
+# -------------------------------
+
+def _engagement(post_id, delta):
+    transaction.on_commit(lambda: rankings.record_engagement(post_id, delta))
+
+
+@receiver(post_save, sender=PostLike)
+def rank_post_like(sender, instance, created, **kwargs):
+    if created:
+        _engagement(instance.post_id, rankings.LIKE_POINTS)
 
+@receiver(post_delete, sender=PostLike)
+def unrank_post_like(sender, instance, origin=None, **kwargs):
+    # A deleted post leaves the rankings by itself
+    if not _deleting(Post, instance.post_id, origin):
+        _engagement(instance.post_id, -rankings.LIKE_POINTS)
+
+
+@receiver(post_save, sender=Comment)
+def rank_comment(sender, instance, created, **kwargs):
+    if created:
+        _engagement(instance.post_id, rankings.COMMENT_POINTS)
+
+@receiver(post_delete, sender=Comment)
+def unrank_comment(sender, instance, origin=None, **kwargs):
+    if not _deleting(Post, instance.post_id, origin):
+        _engagement(instance.post_id, -rankings.COMMENT_POINTS)
+
+
+# -------------------------------
+# 👤 PERSONAL FLAG SETS (see posts/user_flags.py)
+# -------------------------------
+
+def _flag(action, flag, user_id, object_id):
+    transaction.on_commit(lambda: action(flag, user_id, object_id))
+
+
+@receiver(post_save, sender=PostLike)
+def flag_post_like(sender, instance, created, **kwargs):
+    if created:
+        _flag(user_flags.add, "liked", instance.user_id, instance.post_id)
+
+@receiver(post_delete, sender=PostLike)
+def unflag_post_like(sender, instance, **kwargs):
+    _flag(user_flags.remove, "liked", instance.user_id, instance.post_id)
+
+
+@receiver(post_save, sender=CommentLike)
+def flag_comment_like(sender, instance, created, **kwargs):
+    if created:
+        _flag(user_flags.add, "liked_comments", instance.user_id, instance.comment_id)
+
+@receiver(post_delete, sender=CommentLike)
+def unflag_comment_like(sender, instance, **kwargs):
+    _flag(user_flags.remove, "liked_comments", instance.user_id, instance.comment_id)
+
+
+@receiver(post_save, sender=PostReport)
+def flag_post_report(sender, instance, created, **kwargs):
+    if created:
+        _flag(user_flags.add, "reported", instance.reporter_id, instance.post_id)
+
+@receiver(post_delete, sender=PostReport)
+def unflag_post_report(sender, instance, **kwargs):
+    _flag(user_flags.remove, "reported", instance.reporter_id, instance.post_id)
+
+
+@receiver(post_save, sender=CommentReport)
+def flag_comment_report(sender, instance, created, **kwargs):
+    if created:
+        _flag(user_flags.add, "reported_comments", instance.reporter_id, instance.comment_id)
+
+@receiver(post_delete, sender=CommentReport)
+def unflag_comment_report(sender, instance, **kwargs):
+    _flag(user_flags.remove, "reported_comments", instance.reporter_id, instance.comment_id)
+
+
+# -------------------------------
+# 🏷️ ETAG VERSIONS (see posts/etags.py)
+# -------------------------------
+# Anything a feed / post / comment list response shows bumps its version,
+# the user's own likes and reports bump the user version.
+# Registered after the cache receivers above: on commit, caches are
+# dropped first, so a new ETag is never paired with stale data.
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_etag(sender, instance, **kwargs):
+    post_id, community_id = instance.id, instance.community_id
+    transaction.on_commit(lambda: etags.bump_post(post_id, community_id))
+
+def _community_id(instance):
+    # From the post when it is already loaded, else bump_post() looks it up
+    if type(instance).post.is_cached(instance):
+        return instance.post.community_id
+    return None
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_etag(sender, instance, origin=None, **kwargs):
+    # A deleted post / parent comment bumps the post itself
+    if _deleting(Post, instance.post_id, origin) or _deleting(Comment, instance.parent_id, origin):
+        return
+    post_id, community_id = instance.post_id, _community_id(instance)
+    transaction.on_commit(lambda: etags.bump_post(post_id, community_id))
+
+@receiver(post_save, sender=PostLike)
+@receiver(post_delete, sender=PostLike)
+def bump_post_like_etag(sender, instance, origin=None, **kwargs):
+    if _deleting(Post, instance.post_id, origin):
+        return
+    post_id, community_id, user_id = instance.post_id, _community_id(instance), instance.user_id
+
+    def bump():
+        etags.bump_post(post_id, community_id)
+        etags.bump_user(user_id)
+    transaction.on_commit(bump)
+
+@receiver(post_save, sender=CommentLike)
+@receiver(post_delete, sender=CommentLike)
+def bump_comment_like_etag(sender, instance, origin=None, **kwargs):
+    if _deleting(Comment, instance.comment_id, origin):
+        return
+    comment_id, user_id = instance.comment_id, instance.user_id
+
+    def bump():
+        post_id = Comment.objects.filter(pk=comment_id).values_list("post_id", flat=True).first()
+        if post_id:
+            etags.bump_post(post_id)
+        etags.bump_user(user_id)
+    transaction.on_commit(bump)
+
+@receiver(post_save, sender=PostReport)
+@receiver(post_delete, sender=PostReport)
+def bump_post_report_etag(sender, instance, origin=None, **kwargs):
+    if _deleting(Post, instance.post_id, origin):
+        return
+    user_id = instance.reporter_id
+    transaction.on_commit(lambda: etags.bump_user(user_id))
+
+@receiver(post_save, sender=CommentReport)
+@receiver(post_delete, sender=CommentReport)
+def bump_comment_report_etag(sender, instance, origin=None, **kwargs):
+    if _deleting(Comment, instance.comment_id, origin):
+        return
+    user_id = instance.reporter_id
+    transaction.on_commit(lambda: etags.bump_user(user_id))
 
 
 @receiver(post_save, sender=PostLike)
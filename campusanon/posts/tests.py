@@ -1,3 +1,1135 @@
-from django.test import TestCase
+import csv
+from collections import Counter
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import orjson
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from redis.exceptions import RedisError
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from campusanon.redis import redis_client
+from communities.models import Community, CommunityMembership
+from .models import (
+    Post, Comment, PostLike, PostReport, CommentLike, CommentReport, Notification, AdminAuditLog,
+    HIDE_ADMIN, HIDE_BAN,
+)
+from . import bulk_moderation, like_buffer, likes, moderation, post_cache, rankings, timeline, user_flags, views
+from .threads import thread_fields
+from .views import FEED_PAGINATOR, community_feed_entries
+
+# Receivers write to the Django cache (notification flags): keep it local.
+# Anything that reaches Redis directly (on-commit cache refreshes) needs a
+# server at REDIS_URL and is skipped without one.
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def redis_available():
+    try:
+        return redis_client.ping()
+    except RedisError:
+        return False
+
+
+requires_redis = skipUnless(redis_available(), "needs a Redis server at REDIS_URL")
+requires_postgres = skipUnless(connection.vendor == "postgresql", "raw SQL path runs on PostgreSQL only")
+
+
+def make_user(n, **extra):
+    return User.objects.create(
+        email_hash=f"hash-{n}", internal_username=f"user_{n}", year=1, branch="IT", **extra
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, LIKE_WRITE_BEHIND=False)
+class PostsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.community = Community.objects.create(name="All", slug="all", is_global=True)
+        cls.author = make_user(0)
+        cls.users = [make_user(n) for n in range(1, 6)]
+
+    def make_post(self, user=None):
+        return Post.objects.create(
+            user=user or self.author, community=self.community, alias="alias", content="post"
+        )
+
+    def make_comment(self, post, parent=None, user=None):
+        return Comment.objects.create(
+            post=post, user=user or self.author, alias="alias", content="comment",
+            **thread_fields(parent)
+        )
+
+    def refresh(self, obj):
+        obj.refresh_from_db()
+        return obj
+
+    def capture(self, signal, sender):
+        """
+        List of the kwargs of every `signal` sent for `sender` from now on.
+        """
+        sent = []
+
+        def receiver(**kwargs):
+            sent.append(kwargs)
+        signal.connect(receiver, sender=sender, weak=False)
+        self.addCleanup(signal.disconnect, receiver, sender=sender)
+        return sent
+
+
+class CascadeDeleteTests(PostsTestCase):
+    """
+    Deleting a parent must not touch the counters of rows that go away
+    with it (one UPDATE per cascaded child otherwise).
+    """
+
+    def populate(self, post, likes, comments):
+        for user in self.users[:likes]:
+            PostLike.objects.create(user=user, post=post)
+            PostReport.objects.create(reporter=user, post=post)
+        for _ in range(comments):
+            comment = self.make_comment(post)
+            reply = self.make_comment(post, parent=comment)
+            for user in self.users[:likes]:
+                CommentLike.objects.create(user=user, comment=reply)
+
+    def delete_queries(self, instance):
+        with CaptureQueriesContext(connection) as queries:
+            instance.delete()
+        return [query["sql"] for query in queries.captured_queries]
+
+    def test_post_delete_query_count_does_not_grow_with_children(self):
+        small, large = self.make_post(), self.make_post()
+        self.populate(small, likes=1, comments=1)
+        self.populate(large, likes=5, comments=4)
+
+        small_queries = self.delete_queries(small)
+        large_queries = self.delete_queries(large)
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertFalse([sql for sql in large_queries if sql.startswith("UPDATE")])
+
+    def test_post_delete_query_count(self):
+        post = self.make_post()
+        self.populate(post, likes=5, comments=4)
+        with self.assertNumQueries(12):
+            post.delete()
+
+    def test_comment_delete_counts_its_subtree_once(self):
+        post = self.make_post()
+        top = self.make_comment(post)
+        reply = self.make_comment(post, parent=top)
+        self.make_comment(post, parent=reply)
+        other = self.make_comment(post)
+        self.make_comment(post, parent=other)
+        self.assertEqual(self.refresh(post).comments_count, 5)
+
+        self.refresh(reply).delete()
+
+        self.assertEqual(self.refresh(post).comments_count, 3)
+        self.assertEqual(self.refresh(top).replies_count, 0)
+        self.assertEqual(self.refresh(other).replies_count, 1)
+
+    def test_user_delete_keeps_counters_of_surviving_posts(self):
+        leaving = self.users[0]
+        own_post = self.make_post(user=leaving)
+        other_post = self.make_post()
+        PostLike.objects.create(user=leaving, post=other_post)
+        PostLike.objects.create(user=self.users[1], post=own_post)
+        self.make_comment(other_post, user=leaving)
+
+        leaving.delete()
+
+        other_post = self.refresh(other_post)
+        self.assertEqual((other_post.likes_count, other_post.comments_count), (0, 0))
+        self.assertFalse(Post.objects.filter(pk=own_post.pk).exists())
+
+    def commit_work(self, instance):
+        """
+        {receiver name: on-commit callbacks it queued} for deleting `instance`.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            instance.delete()
+        return Counter(callback.__qualname__.split(".")[0] for callback in callbacks)
+
+    def test_post_delete_bumps_etags_for_the_post_only(self):
+        post = self.make_post()
+        self.populate(post, likes=5, comments=4)
+
+        work = self.commit_work(post)
+
+        etag_bumps = {name: n for name, n in work.items() if name.endswith("_etag")}
+        self.assertEqual(etag_bumps, {"bump_post_etag": 1})
+
+    def test_post_delete_skips_rankings_for_its_children(self):
+        post = self.make_post()
+        self.populate(post, likes=5, comments=4)
+
+        self.assertNotIn("_engagement", self.commit_work(post))
+
+
+class ReportThresholdTests(PostsTestCase):
+
+    def report_all(self, post, n):
+        for user in self.users[:n]:
+            PostReport.objects.create(reporter=user, post=post)
+
+    def test_withdrawn_report_unhides_below_threshold(self):
+        post = self.make_post()
+        self.report_all(post, 3)
+        self.assertTrue(self.refresh(post).is_hidden)
+
+        PostReport.objects.filter(post=post).first().delete()
+
+        self.assertFalse(self.refresh(post).is_hidden)
+
+    def test_withdrawn_report_keeps_ban_purge(self):
+        post = self.make_post()
+        comment = self.make_comment(post)
+        self.report_all(post, 1)
+        CommentReport.objects.create(reporter=self.users[0], comment=comment)
+        bulk_moderation.purge_user(self.author)
+
+        PostReport.objects.get(post=post).delete()
+        CommentReport.objects.get(comment=comment).delete()
+
+        post, comment = self.refresh(post), self.refresh(comment)
+        self.assertEqual((post.is_hidden, post.hide_reason), (True, HIDE_BAN))
+        self.assertEqual((comment.is_hidden, comment.hide_reason), (True, HIDE_BAN))
+
+    def test_withdrawn_report_keeps_admin_hide(self):
+        post = self.make_post()
+        self.report_all(post, 1)
+        bulk_moderation.apply(self.author, "post", "hide", bulk_moderation.select("post", ids=[post.pk]))
+
+        PostReport.objects.get(post=post).delete()
+
+        post = self.refresh(post)
+        self.assertEqual((post.is_hidden, post.hide_reason), (True, HIDE_ADMIN))
+
+    def test_admin_hide_takes_over_report_hide(self):
+        post = self.make_post()
+        self.report_all(post, 3)
+
+        hidden = bulk_moderation.apply(
+            self.author, "post", "hide", bulk_moderation.select("post", ids=[post.pk])
+        )
+        PostReport.objects.filter(post=post).first().delete()
+
+        self.assertEqual(hidden, 1)
+        self.assertEqual(self.refresh(post).hide_reason, HIDE_ADMIN)
+        self.assertTrue(self.refresh(post).is_hidden)
+
+    def test_unban_restores_only_the_purge(self):
+        purged, admin_hidden = self.make_post(), self.make_post()
+        bulk_moderation.apply(self.author, "post", "hide", bulk_moderation.select("post", ids=[admin_hidden.pk]))
+        bulk_moderation.purge_user(self.author)
+
+        bulk_moderation.restore_user(self.author)
+
+        self.assertEqual(self.refresh(purged).is_hidden, False)
+        self.assertEqual(self.refresh(purged).hide_reason, "")
+        self.assertEqual(self.refresh(admin_hidden).hide_reason, HIDE_ADMIN)
+
+
+class BulkModerationTests(PostsTestCase):
+
+    def test_delete_comments_removes_subtrees_only(self):
+        post, other_post = self.make_post(), self.make_post()
+        top = self.make_comment(post)
+        doomed = self.make_comment(post, parent=top)
+        self.make_comment(post, parent=doomed)
+        kept = self.make_comment(post, parent=top)
+        untouched = self.make_comment(other_post)
+
+        with CaptureQueriesContext(connection) as queries:
+            deleted = bulk_moderation.apply(
+                self.author, "comment", "delete", bulk_moderation.select("comment", ids=[doomed.pk])
+            )
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(
+            set(Comment.objects.values_list("pk", flat=True)), {top.pk, kept.pk, untouched.pk}
+        )
+        self.assertEqual(self.refresh(post).comments_count, 2)
+        self.assertEqual(self.refresh(top).replies_count, 1)
+        self.assertEqual(self.refresh(other_post).comments_count, 1)
+        # The subtree lookup is restricted to the selection's posts
+        subtree_sql = next(q["sql"] for q in queries.captured_queries if "EXISTS" in q["sql"])
+        self.assertIn(f'"{Comment._meta.db_table}"."post_id" IN (SELECT', subtree_sql)
+
+
+class PostCacheTests(PostsTestCase):
+
+    def test_refill_racing_an_invalidation_is_not_served(self):
+        post = self.make_post()
+        load = post_cache.project
+
+        def load_then_change(queryset, row):
+            # The post changes (and is invalidated) while the miss is loaded
+            rows = load(queryset, row)
+            Post.objects.filter(pk=post.pk).update(is_hidden=True)
+            post_cache.invalidate(post.pk)
+            return rows
+
+        with mock.patch.object(post_cache, "project", load_then_change):
+            self.assertFalse(post_cache.get_many([post.pk])[str(post.pk)]["is_hidden"])
+
+        with self.assertNumQueries(1):
+            self.assertTrue(post_cache.get_many([post.pk])[str(post.pk)]["is_hidden"])
+        with self.assertNumQueries(0):
+            post_cache.get_many([post.pk])
+
+
+@requires_redis
+class UserFlagsTests(PostsTestCase):
+
+    def setUp(self):
+        self.user = self.users[0]
+        self.keys = [user_flags.flag_key("liked", self.user.id), user_flags.generation_key("liked", self.user.id)]
+        redis_client.delete(*self.keys)
+        self.addCleanup(redis_client.delete, *self.keys)
+
+    def test_load_racing_a_like_is_not_stored(self):
+        liked, racing = self.make_post(), self.make_post()
+        PostLike.objects.create(user=self.user, post=liked)
+        fill = user_flags._fill
+
+        def like_then_fill(keys, args):
+            # Liked (and committed) after the load's query
+            PostLike.objects.create(user=self.user, post=racing)
+            user_flags.add("liked", self.user.id, racing.id)
+            return fill(keys=keys, args=args)
+
+        ids = [liked.pk, racing.pk]
+        with mock.patch.object(user_flags, "_fill", like_then_fill):
+            user_flags.lookup(self.user.id, ("liked",), ids)
+        self.assertFalse(redis_client.exists(self.keys[0]))
+
+        found = user_flags.lookup(self.user.id, ("liked",), ids)["liked"]
+        self.assertEqual(found, {str(liked.pk), str(racing.pk)})
+        self.assertTrue(redis_client.exists(self.keys[0]))
+
+
+class LikeToggleTests(PostsTestCase):
+    """
+    Runs on the database's own path: the single-statement SQL on
+    PostgreSQL, the ORM fallback elsewhere. LikeToggleOrmTests holds the
+    fallback to the same expectations.
+    """
+
+    def toggle(self, like_model, target_field, user, target_id):
+        return likes._toggle(like_model, target_field, user, target_id)
+
+    def toggle_post(self, user, post):
+        return self.toggle(PostLike, "post", user, post.pk)
+
+    def test_toggle_likes_then_unlikes(self):
+        post = self.make_post()
+        user = self.users[0]
+
+        self.assertEqual(self.toggle_post(user, post), (True, 1))
+        self.assertEqual(self.toggle_post(user, post), (False, 0))
+        self.assertEqual(self.toggle_post(user, post), (True, 1))
+        self.assertEqual(PostLike.objects.filter(post=post).count(), 1)
+        self.assertEqual(self.refresh(post).likes_count, 1)
+
+    def test_counts_each_like_once(self):
+        # The receivers must not count a like the SQL already counted
+        post = self.make_post()
+        for n, user in enumerate(self.users, start=1):
+            self.assertEqual(self.toggle_post(user, post), (True, n))
+        self.toggle_post(self.users[0], post)
+
+        self.assertEqual(self.refresh(post).likes_count, len(self.users) - 1)
+
+    def test_existing_like_is_removed(self):
+        post = self.make_post()
+        PostLike.objects.create(user=self.users[0], post=post)
+
+        self.assertEqual(self.toggle_post(self.users[0], post), (False, 0))
+        self.assertFalse(PostLike.objects.filter(post=post).exists())
+
+    def test_missing_target(self):
+        post = self.make_post()
+        post_id = post.pk
+        post.delete()
+
+        self.assertIsNone(self.toggle(PostLike, "post", self.users[0], post_id))
+        self.assertFalse(PostLike.objects.exists())
+
+    def test_comment_toggle(self):
+        comment = self.make_comment(self.make_post())
+
+        self.assertEqual(self.toggle(CommentLike, "comment", self.users[0], comment.pk), (True, 1))
+        self.assertEqual(self.toggle(CommentLike, "comment", self.users[1], comment.pk), (True, 2))
+        self.assertEqual(self.toggle(CommentLike, "comment", self.users[0], comment.pk), (False, 1))
+        self.assertEqual(self.refresh(comment).likes_count, 1)
+
+    def test_signals_sent_once_per_change(self):
+        post = self.make_post()
+        user = self.users[0]
+        saved = self.capture(post_save, PostLike)
+        deleted = self.capture(post_delete, PostLike)
+
+        self.toggle_post(user, post)
+        self.toggle_post(user, post)
+
+        self.assertEqual(len(saved), 1)
+        self.assertTrue(saved[0]["created"])
+        self.assertEqual(len(deleted), 1)
+        for instance in (saved[0]["instance"], deleted[0]["instance"]):
+            self.assertEqual((instance.user_id, instance.post_id), (user.id, post.pk))
+
+
+class LikeToggleOrmTests(LikeToggleTests):
+
+    def toggle(self, like_model, target_field, user, target_id):
+        return likes._toggle_orm(like_model, target_field, user, target_id)
+
+
+@requires_postgres
+class LikeToggleSqlTests(PostsTestCase):
+
+    def test_signal_instances_are_marked_counted(self):
+        post = self.make_post()
+        saved = self.capture(post_save, PostLike)
+        deleted = self.capture(post_delete, PostLike)
+
+        likes.toggle_post_like(self.users[0], post.pk)
+        likes.toggle_post_like(self.users[0], post.pk)
+
+        self.assertTrue(getattr(saved[0]["instance"], likes.COUNTED, False))
+        self.assertTrue(getattr(deleted[0]["instance"], likes.COUNTED, False))
+
+    def test_like_removed_by_a_parallel_toggle(self):
+        post = self.make_post()
+        likes.toggle_post_like(self.users[0], post.pk)
+        sql = likes._sql
+
+        def unlike_first(template, *args):
+            if template is likes._UNLIKE_SQL:
+                # The other request's unlike lands between our two statements
+                PostLike.objects.filter(post=post).delete()
+            return sql(template, *args)
+
+        with mock.patch.object(likes, "_sql", unlike_first):
+            self.assertEqual(likes.toggle_post_like(self.users[0], post.pk), (False, 0))
+
+
+class ReportTests(PostsTestCase):
+    """
+    report() on the database's own path, see LikeToggleTests.
+    """
+
+    def report(self, model, user, target_id):
+        return moderation.report(model, user, target_id, "spam")
+
+    def test_hides_at_threshold(self):
+        post = self.make_post()
+        threshold = moderation.REPORT_THRESHOLD
+        for n, user in enumerate(self.users[:threshold], start=1):
+            self.assertEqual(self.report(Post, user, post.pk), (True, n, n >= threshold))
+
+        post = self.refresh(post)
+        self.assertEqual((post.reports_count, post.is_hidden), (threshold, True))
+
+    def test_hidden_target_takes_no_reports(self):
+        post = self.make_post()
+        threshold = moderation.REPORT_THRESHOLD
+        for user in self.users[:threshold]:
+            self.report(Post, user, post.pk)
+
+        self.assertEqual(self.report(Post, self.users[threshold], post.pk), (False, threshold, True))
+        self.assertEqual(PostReport.objects.filter(post=post).count(), threshold)
+
+    def test_repeated_report_counts_once(self):
+        post = self.make_post()
+        self.report(Post, self.users[0], post.pk)
+
+        self.assertEqual(self.report(Post, self.users[0], post.pk), (False, 1, False))
+        self.assertEqual(self.refresh(post).reports_count, 1)
+
+    def test_missing_target(self):
+        post = self.make_post()
+        post_id = post.pk
+        post.delete()
+
+        self.assertIsNone(self.report(Post, self.users[0], post_id))
+
+    def test_comment_hides_at_threshold(self):
+        comment = self.make_comment(self.make_post())
+        for user in self.users[:moderation.COMMENT_REPORT_THRESHOLD]:
+            created, _, hidden = self.report(Comment, user, comment.pk)
+
+        self.assertTrue(created and hidden)
+        self.assertTrue(self.refresh(comment).is_hidden)
+
+    def test_signals(self):
+        # One post_save per report, one visibility save for the target
+        post = self.make_post()
+        reports = self.capture(post_save, PostReport)
+        saves = self.capture(post_save, Post)
+
+        for user in self.users[:moderation.REPORT_THRESHOLD]:
+            self.report(Post, user, post.pk)
+
+        self.assertEqual(len(reports), moderation.REPORT_THRESHOLD)
+        self.assertTrue(all(sent["created"] for sent in reports))
+        hides = [sent for sent in saves if "is_hidden" in (sent["update_fields"] or ())]
+        self.assertEqual(len(hides), 1)
+        self.assertEqual((hides[0]["instance"].pk, hides[0]["instance"].is_hidden), (post.pk, True))
+        self.assertEqual(hides[0]["instance"].community_id, self.community.pk)
+
+
+class ReportOrmTests(ReportTests):
+
+    def report(self, model, user, target_id):
+        return moderation._report_orm(model, user, target_id, "spam")
+
+
+@requires_postgres
+class ReportSqlTests(PostsTestCase):
+
+    def test_signal_instances_are_marked_counted(self):
+        post = self.make_post()
+        reports = self.capture(post_save, PostReport)
+
+        moderation.report(Post, self.users[0], post.pk, "spam")
+
+        self.assertTrue(getattr(reports[0]["instance"], likes.COUNTED, False))
+
+
+@requires_redis
+class SearchTests(PostsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.restricted = Community.objects.create(name="2 IT", slug="2-it", year=2, branch="IT")
+        cls.searcher = User.objects.create(
+            email_hash="hash-comp", internal_username="user_comp", year=1, branch="COMP"
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.searcher)
+        self.visible = self.make_post()
+        self.hidden_away = Post.objects.create(
+            user=self.author, community=self.restricted, alias="alias", content="post"
+        )
+
+    def search(self, **params):
+        return self.client.get("/posts/search/", {"q": "post", **params})
+
+    def test_only_readable_communities(self):
+        response = self.search()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["results"]], [str(self.visible.pk)])
+
+    def test_unreadable_community_is_denied(self):
+        self.assertEqual(self.search(community_id=str(self.restricted.pk)).status_code, 403)
+        self.assertEqual(self.search(community_id="not-a-uuid").status_code, 403)
+
+        response = self.search(community_id=str(self.community.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+
+@requires_redis
+class TimelineTests(PostsTestCase):
+
+    def setUp(self):
+        cid = self.community.pk
+        keys = [
+            timeline.timeline_key(cid), timeline.state_key(cid), timeline.generation_key(cid),
+            rankings.state_key(cid), rankings.generation_key(cid),
+            *(rankings.rank_key(mode, cid) for mode in rankings.MODES),
+        ]
+        redis_client.delete(*keys)
+        self.addCleanup(redis_client.delete, *keys)
+
+    def make_posts(self, *created_at):
+        posts = [self.make_post() for _ in created_at]
+        for post, at in zip(posts, created_at):
+            Post.objects.filter(pk=post.pk).update(created_at=at)
+        return posts
+
+    def sql_page(self, after, limit):
+        queryset = Post.objects.filter(community=self.community, is_hidden=False)
+        rows = FEED_PAGINATOR.after(queryset, after).values_list("id", "created_at")[:limit]
+        return [(str(pk), created_at) for pk, created_at in rows]
+
+    def walk(self, read, limit):
+        pages, after = [], None
+        while True:
+            page = read(after, limit)
+            pages.append(page)
+            if len(page) < limit:
+                return pages
+            after = page[-1][1], page[-1][0]
+
+    def test_pages_match_sql_with_tied_timestamps(self):
+        now = timezone.now()
+        self.make_posts(*[now] * 3, *[now - timedelta(seconds=1)] * 4)
+        timeline.rebuild(self.community.pk)
+
+        from_timeline = self.walk(lambda after, limit: timeline.read_page(self.community.pk, after, limit), 2)
+
+        self.assertEqual(from_timeline, self.walk(self.sql_page, 2))
+        self.assertEqual(sum(map(len, from_timeline)), 7)
+
+    def test_cold_timeline_falls_back_to_sql(self):
+        self.make_posts(timezone.now())
+        self.assertIsNone(timeline.read_page(self.community.pk, None, 5))
+
+        entries = community_feed_entries(self.community.pk, None, 5)
+
+        self.assertEqual(entries, self.sql_page(None, 5))
+        # The fallback rebuilt the timeline
+        self.assertEqual(timeline.read_page(self.community.pk, None, 5), entries)
+
+    def test_trimmed_timeline_hands_deeper_pages_to_sql(self):
+        now = timezone.now()
+        posts = self.make_posts(*(now - timedelta(seconds=n) for n in range(5)))
+        with mock.patch.object(timeline, "TIMELINE_SIZE", 3):
+            timeline.rebuild(self.community.pk)
+
+        self.assertEqual(len(timeline.read_page(self.community.pk, None, 3)), 3)
+        after = (now - timedelta(seconds=2), posts[2].pk)
+        self.assertIsNone(timeline.read_page(self.community.pk, after, 3))
+
+    def test_rebuild_racing_a_new_post_is_not_stored(self):
+        self.make_posts(timezone.now())
+        store = timeline.write_if_unchanged
+
+        def post_then_store(*args):
+            # Committed after rebuild()'s query, while the timeline is cold
+            timeline.add_post(self.make_post())
+            return store(*args)
+
+        with mock.patch.object(timeline, "write_if_unchanged", post_then_store):
+            self.assertIsNone(timeline.rebuild(self.community.pk))
+        self.assertIsNone(timeline.read_page(self.community.pk, None, 5))
+
+        self.assertEqual(timeline.rebuild(self.community.pk), 2)
+        self.assertEqual(len(timeline.read_page(self.community.pk, None, 5)), 2)
+
+    def test_ranking_rebuild_racing_a_new_post_is_not_stored(self):
+        first = self.make_post()
+        store = rankings.write_if_unchanged
+        late = []
+
+        def post_then_store(*args):
+            late.append(self.make_post())
+            rankings.add_post(late[0])
+            return store(*args)
+
+        with mock.patch.object(rankings, "write_if_unchanged", post_then_store):
+            # Answered from the rebuild itself
+            self.assertEqual(rankings.read_page("hot", self.community.pk, 0, 5), [str(first.pk)])
+        self.assertFalse(redis_client.exists(rankings.state_key(self.community.pk)))
+
+        self.assertEqual(
+            set(rankings.read_page("hot", self.community.pk, 0, 5)), {str(first.pk), str(late[0].pk)}
+        )
+
+
+@requires_redis
+class ETagTests(PostsTestCase):
+
+    def setUp(self):
+        self.post = self.make_post()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.urls = [
+            f"/posts/get/{self.post.pk}/",
+            f"/posts/comment/{self.post.pk}/list/",
+            f"/posts/feed/{self.community.pk}/",
+        ]
+
+    def etags(self):
+        responses = [self.client.get(url) for url in self.urls]
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        return [response["ETag"] for response in responses]
+
+    def test_matching_etag_answers_304_without_queries(self):
+        for url, etag in zip(self.urls, self.etags()):
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+
+        stale = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_comment_changes_every_etag(self):
+        before = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/posts/comment/{self.post.pk}/", {"content": "hi"})
+        self.assertEqual(response.status_code, 201)
+
+        for old, new in zip(before, self.etags()):
+            self.assertNotEqual(old, new)
+
+    def test_like_changes_every_etag(self):
+        before = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            PostLike.objects.create(user=self.users[1], post=self.post)
+
+        for old, new in zip(before, self.etags()):
+            self.assertNotEqual(old, new)
+
+    def test_hide_changes_every_etag(self):
+        before = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_moderation.apply(
+                self.author, "post", "hide", Post.objects.filter(pk=self.post.pk)
+            )
+
+        after = [self.client.get(url) for url in self.urls]
+        self.assertEqual(after[0].status_code, 200)
+        for old, response in zip(before, after):
+            self.assertNotEqual(old, response["ETag"])
+
+    def test_report_changes_only_the_reporters_etags(self):
+        before = self.etags()
+        other = APIClient()
+        other.force_authenticate(self.users[1])
+        others_before = [other.get(url)["ETag"] for url in self.urls]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/posts/report/{self.post.pk}/", {"reason": "spam"})
+        self.assertEqual(response.status_code, 200)
+
+        for old, new in zip(before, self.etags()):
+            self.assertNotEqual(old, new)
+        self.assertEqual([other.get(url)["ETag"] for url in self.urls], others_before)
+
+
+@requires_redis
+class HomeFeedTests(PostsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.club = Community.objects.create(name="Coding Club", slug="coding-club")
+        # Readable by year / branch, but not joined
+        cls.not_joined = Community.objects.create(name="1 IT", slug="1-it", year=1, branch="IT")
+        CommunityMembership.objects.create(user=cls.users[0], community=cls.club)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        keys = []
+        for community in (self.community, self.club, self.not_joined):
+            cid = community.pk
+            keys += [timeline.timeline_key(cid), timeline.state_key(cid), timeline.generation_key(cid)]
+        redis_client.delete(*keys)
+        self.addCleanup(redis_client.delete, *keys)
+
+    def make_posts(self, community, *created_at):
+        posts = []
+        for at in created_at:
+            post = Post.objects.create(
+                user=self.author, community=community, alias="alias", content="post"
+            )
+            Post.objects.filter(pk=post.pk).update(created_at=at)
+            posts.append(post)
+        return posts
+
+    def read_all(self):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get("/posts/home/", {"cursor": cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            pages.append([item["id"] for item in response.data["results"]])
+            cursor = response.data["next_cursor"]
+            if cursor is None:
+                return pages
+
+    def test_merges_joined_communities_newest_first(self):
+        now = timezone.now()
+        at = [now - timedelta(seconds=n) for n in range(5)]
+        own = self.make_posts(self.community, at[0], at[2], at[4])
+        club = self.make_posts(self.club, at[1], at[3])
+        self.make_posts(self.not_joined, now)
+
+        with mock.patch.object(views, "PAGE_SIZE", 2):
+            # Cold timelines, then the rebuilt ones
+            for _ in range(2):
+                pages = self.read_all()
+                self.assertEqual([len(page) for page in pages], [2, 2, 1])
+                self.assertEqual(
+                    sum(pages, []),
+                    [str(p.pk) for p in (own[0], club[0], own[1], club[1], own[2])]
+                )
+
+    def test_hidden_posts_are_dropped_at_hydration(self):
+        now = timezone.now()
+        posts = self.make_posts(self.community, now, now - timedelta(seconds=1))
+        self.read_all()
+
+        # Still on the timeline, already hidden in the post cache
+        Post.objects.filter(pk=posts[0].pk).update(is_hidden=True)
+        post_cache.invalidate(posts[0].pk)
+
+        self.assertEqual(self.read_all(), [[str(posts[1].pk)]])
+        kept = post_cache.hydrate([posts[0].pk], include_hidden=True)
+        self.assertEqual([entry["id"] for entry in kept], [str(posts[0].pk)])
+
+
+@requires_redis
+class RankingTests(PostsTestCase):
+
+    def setUp(self):
+        cid = self.community.pk
+        keys = [
+            rankings.state_key(cid), rankings.generation_key(cid),
+            *(rankings.rank_key(mode, cid) for mode in rankings.MODES),
+        ]
+        redis_client.delete(*keys)
+        self.addCleanup(redis_client.delete, *keys)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def make_ranked_post(self, age, likes_count=0):
+        post = self.make_post()
+        Post.objects.filter(pk=post.pk).update(
+            created_at=timezone.now() - age, likes_count=likes_count
+        )
+        return post
+
+    def test_windows_and_order(self):
+        old = self.make_ranked_post(timedelta(days=2), likes_count=10)
+        liked = self.make_ranked_post(timedelta(hours=2), likes_count=3)
+        fresh = self.make_ranked_post(timedelta(hours=1))
+        self.make_ranked_post(timedelta(days=8), likes_count=50)
+
+        def page(mode):
+            return rankings.read_page(mode, self.community.pk, 0, 10)
+
+        self.assertEqual(page("top_day"), [str(liked.pk), str(fresh.pk)])
+        self.assertEqual(page("top_week"), [str(old.pk), str(liked.pk), str(fresh.pk)])
+        # 25 points two days ago decay below 5 points an hour ago
+        self.assertEqual(page("hot"), [str(liked.pk), str(fresh.pk), str(old.pk)])
+
+    def test_like_moves_a_post_up(self):
+        first = self.make_ranked_post(timedelta(hours=1), likes_count=1)
+        second = self.make_ranked_post(timedelta(hours=2))
+        rankings.rebuild(self.community.pk)
+
+        def page():
+            return rankings.read_page("top_day", self.community.pk, 0, 2)
+        self.assertEqual(page(), [str(first.pk), str(second.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in self.users[1:3]:
+                PostLike.objects.create(user=user, post=second)
+
+        self.assertEqual(page(), [str(second.pk), str(first.pk)])
+        score = redis_client.zscore(rankings.rank_key("top_day", self.community.pk), str(second.pk))
+        self.assertEqual(score, rankings.POST_POINTS + 2 * rankings.LIKE_POINTS)
+
+    def test_decay_ages_hot_scores_only(self):
+        post = self.make_ranked_post(timedelta(0))
+        rankings.rebuild(self.community.pk)
+        key = rankings.rank_key("hot", self.community.pk)
+        before = redis_client.zscore(key, str(post.pk))
+
+        rankings.decay(self.community.pk)
+
+        self.assertAlmostEqual(redis_client.zscore(key, str(post.pk)), before * rankings.HOT_DECAY)
+        top = redis_client.zscore(rankings.rank_key("top_day", self.community.pk), str(post.pk))
+        self.assertEqual(top, rankings.POST_POINTS)
+
+    def test_feed_pages_through_a_ranking(self):
+        posts = [self.make_ranked_post(timedelta(hours=1), likes_count=n) for n in range(3)]
+        url = f"/posts/feed/{self.community.pk}/"
+
+        with mock.patch.object(views, "PAGE_SIZE", 2):
+            first = self.client.get(url, {"sort": "top_day"})
+            second = self.client.get(url, {"sort": "top_day", "cursor": first.data["next_cursor"]})
+            wrong_sort = self.client.get(url, {"sort": "hot", "cursor": first.data["next_cursor"]})
+
+        ids = [item["id"] for item in first.data["results"] + second.data["results"]]
+        self.assertEqual(ids, [str(p.pk) for p in reversed(posts)])
+        self.assertIsNone(second.data["next_cursor"])
+        self.assertEqual(wrong_sort.status_code, 400)
+        self.assertEqual(self.client.get(url, {"sort": "best"}).status_code, 400)
+
+
+@requires_redis
+class CommentPreviewTests(PostsTestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.url = f"/posts/feed/{self.community.pk}/"
+
+    def test_first_visible_top_level_comments(self):
+        post = self.make_post()
+        comments = [self.make_comment(post) for _ in range(views.COMMENT_PREVIEW_SIZE + 1)]
+        self.make_comment(post, parent=comments[0])
+        Comment.objects.filter(pk=comments[1].pk).update(is_hidden=True)
+        bare = self.make_post()
+
+        response = self.client.get(self.url, {"include": "comments_preview"})
+
+        previews = {item["id"]: item["comments_preview"] for item in response.data["results"]}
+        shown = [comments[0], *comments[2:views.COMMENT_PREVIEW_SIZE + 1]]
+        self.assertEqual([c["id"] for c in previews[str(post.pk)]], [str(c.pk) for c in shown])
+        self.assertEqual(previews[str(bare.pk)], [])
+
+    def test_opt_in(self):
+        self.make_comment(self.make_post())
+
+        response = self.client.get(self.url)
+
+        self.assertNotIn("comments_preview", response.data["results"][0])
+
+    def test_one_query_for_any_number_of_posts(self):
+        def queries(posts):
+            for post in posts:
+                self.make_comment(post)
+            results = [{"id": str(post.pk)} for post in posts]
+            with CaptureQueriesContext(connection) as captured:
+                views.attach_comment_previews(results, self.users[0])
+            self.assertTrue(all(len(item["comments_preview"]) == 1 for item in results))
+            return len(captured)
+
+        self.assertEqual(queries([self.make_post()]), 1)
+        self.assertEqual(queries([self.make_post() for _ in range(5)]), 1)
+
+
+@requires_redis
+@override_settings(LIKE_WRITE_BEHIND=True)
+class LikeBufferTests(PostsTestCase):
+
+    def setUp(self):
+        self.post = self.make_post()
+        post_id = str(self.post.pk)
+        self.addCleanup(redis_client.delete, like_buffer.buffer_key(post_id))
+        self.addCleanup(redis_client.hdel, like_buffer.DELTA_KEY, post_id)
+        self.addCleanup(redis_client.srem, like_buffer.DIRTY_KEY, post_id)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def toggle(self, user):
+        response = self.client_for(user).post(f"/posts/like/{self.post.pk}/")
+        self.assertEqual(response.status_code, 200)
+        return response.data["liked"], response.data["likes_count"]
+
+    def read(self, user):
+        return self.client_for(user).get(f"/posts/get/{self.post.pk}/").data
+
+    def flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            like_buffer.flush()
+
+    def test_toggles_stay_in_redis_until_the_flush(self):
+        self.assertEqual(self.toggle(self.users[0]), (True, 1))
+        self.assertEqual(self.toggle(self.users[0]), (False, 0))
+        self.assertEqual(self.toggle(self.users[0]), (True, 1))
+        self.assertFalse(PostLike.objects.exists())
+
+        mine, theirs = self.read(self.users[0]), self.read(self.users[1])
+        self.assertEqual((mine["is_liked"], mine["likes_count"]), (True, 1))
+        self.assertEqual((theirs["is_liked"], theirs["likes_count"]), (False, 1))
+
+    def test_flush_writes_the_latest_intents(self):
+        for user in self.users[:3]:
+            self.toggle(user)
+        self.toggle(self.users[2])
+        self.toggle(self.author)
+
+        self.flush()
+
+        likers = set(PostLike.objects.filter(post=self.post).values_list("user_id", flat=True))
+        self.assertEqual(likers, {self.users[0].pk, self.users[1].pk, self.author.pk})
+        self.assertEqual(self.refresh(self.post).likes_count, 3)
+        # Nobody is notified of liking their own post
+        self.assertEqual(Notification.objects.filter(post=self.post, verb="like").count(), 2)
+        self.assertFalse(redis_client.sismember(like_buffer.DIRTY_KEY, str(self.post.pk)))
+
+        mine = self.read(self.users[0])
+        self.assertEqual((mine["is_liked"], mine["likes_count"]), (True, 3))
+
+    def test_unlike_of_a_stored_like_counts_once(self):
+        with override_settings(LIKE_WRITE_BEHIND=False), self.captureOnCommitCallbacks(execute=True):
+            PostLike.objects.create(user=self.users[0], post=self.post)
+        self.assertEqual(self.refresh(self.post).likes_count, 1)
+
+        self.assertEqual(self.toggle(self.users[0]), (False, 0))
+        self.flush()
+
+        self.assertFalse(PostLike.objects.exists())
+        self.assertEqual(self.refresh(self.post).likes_count, 0)
+
+    def test_failed_flush_keeps_the_intents(self):
+        self.toggle(self.users[0])
+
+        with mock.patch.object(like_buffer, "_apply", side_effect=RuntimeError), \
+                self.assertLogs("posts.like_buffer", "WARNING"):
+            self.assertEqual(like_buffer.flush(), 0)
+        self.assertFalse(PostLike.objects.exists())
+        self.assertTrue(redis_client.sismember(like_buffer.DIRTY_KEY, str(self.post.pk)))
+
+        self.flush()
+        self.assertEqual(self.refresh(self.post).likes_count, 1)
+
+
+class ModerationQueueTests(PostsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = make_user("admin", is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        now = timezone.now()
+        post = self.make_post()
+        # Ties on the count, and on count + time (broken by id)
+        self.queued = []
+        for target, reports_count, seconds, is_hidden in (
+            (post, 4, 0, False), (self.make_comment(post), 4, 1, False),
+            (self.make_post(), 2, 2, False),
+            (self.make_comment(post), 1, 3, False), (self.make_post(), 1, 3, True),
+        ):
+            type(target).objects.filter(pk=target.pk).update(
+                reports_count=reports_count,
+                created_at=now - timedelta(seconds=seconds),
+                is_hidden=is_hidden,
+            )
+            self.queued.append(self.refresh(target))
+        self.make_post()  # Never reported
+
+    def read_all(self, **params):
+        pages, cursor = [], None
+        with mock.patch.object(views, "QUEUE_PAGE_SIZE", 2):
+            while True:
+                page_params = {**params, "cursor": cursor} if cursor else params
+                response = self.client.get("/posts/admin/queue/", page_params)
+                self.assertEqual(response.status_code, 200)
+                pages.append([item["id"] for item in response.data["results"]])
+                cursor = response.data["next_cursor"]
+                if cursor is None:
+                    return pages
+
+    def expected(self, targets):
+        key = lambda t: (t.reports_count, t.created_at, t.id)
+        return [str(t.pk) for t in sorted(targets, key=key, reverse=True)]
+
+    def test_pages_merge_posts_and_comments(self):
+        pages = self.read_all()
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), self.expected(self.queued))
+
+    def test_filters(self):
+        posts = [t for t in self.queued if isinstance(t, Post)]
+        self.assertEqual(sum(self.read_all(type="post"), []), self.expected(posts))
+        hidden = self.read_all(hidden="true")
+        self.assertEqual(hidden, [[str(self.queued[-1].pk)]])
+
+    def test_rejects_bad_input(self):
+        url = "/posts/admin/queue/"
+        self.assertEqual(self.client.get(url, {"type": "user"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"cursor": "garbage"}).status_code, 400)
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class AuditLogTests(PostsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = make_user("admin", is_staff=True)
+        cls.other_admin = make_user("admin_2", is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.day = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        for admin, action, target_type, age, details in (
+            (self.admin, "HIDE_POST", "post", timedelta(days=2), {}),
+            (self.admin, "BAN_USER", "user", timedelta(days=1), {"posts_hidden": 3}),
+            (self.other_admin, "HIDE_COMMENT", "comment", timedelta(hours=1), {}),
+        ):
+            log = AdminAuditLog.objects.create(
+                admin=admin, action=action, target_type=target_type,
+                target_id=self.author.pk, reason="spam", details=details,
+            )
+            AdminAuditLog.objects.filter(pk=log.pk).update(created_at=self.day - age)
+
+    def actions(self, **params):
+        response = self.client.get("/posts/admin/audit-logs/", params)
+        self.assertEqual(response.status_code, 200)
+        return [item["action"] for item in response.data["results"]]
+
+    def test_filters(self):
+        self.assertEqual(self.actions(), ["HIDE_COMMENT", "BAN_USER", "HIDE_POST"])
+        self.assertEqual(self.actions(admin_id=str(self.other_admin.pk)), ["HIDE_COMMENT"])
+        self.assertEqual(self.actions(action="BAN_USER"), ["BAN_USER"])
+        self.assertEqual(self.actions(target_type="post"), ["HIDE_POST"])
+        since = (self.day - timedelta(days=1)).isoformat()
+        self.assertEqual(self.actions(since=since), ["HIDE_COMMENT", "BAN_USER"])
+        # Plain dates are midnight UTC, `until` is exclusive
+        until = (self.day - timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.actions(until=until), ["HIDE_POST"])
+
+    def test_rejects_bad_filters(self):
+        url = "/posts/admin/audit-logs/"
+        self.assertEqual(self.client.get(url, {"since": "yesterday"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"admin_id": "not-a-uuid"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"cursor": "garbage"}).status_code, 400)
+
+    def test_pages(self):
+        with mock.patch.object(views.AUDIT_LOG_PAGINATOR, "page_size", 2):
+            first = self.client.get("/posts/admin/audit-logs/")
+            second = self.client.get("/posts/admin/audit-logs/", {"cursor": first.data["next_cursor"]})
+
+        self.assertEqual([item["action"] for item in first.data["results"]], ["HIDE_COMMENT", "BAN_USER"])
+        self.assertEqual([item["action"] for item in second.data["results"]], ["HIDE_POST"])
+        self.assertIsNone(second.data["next_cursor"])
+
+    def test_csv_export_streams(self):
+        response = self.client.get(
+            "/posts/admin/audit-logs/export/", {"output": "csv", "admin_id": str(self.admin.pk)}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        rows = list(csv.reader(lines))
+        self.assertEqual(
+            rows[0], ["admin_id", "action", "target_type", "target_id", "reason", "details", "created_at"]
+        )
+        self.assertEqual([row[1] for row in rows[1:]], ["BAN_USER", "HIDE_POST"])
+        self.assertEqual(orjson.loads(rows[1][5]), {"posts_hidden": 3})
+        self.assertEqual(rows[2][5], "")
+
+    def test_ndjson_export(self):
+        response = self.client.get("/posts/admin/audit-logs/export/", {"action": "HIDE_COMMENT"})
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual([orjson.loads(line)["action"] for line in lines], ["HIDE_COMMENT"])
+        self.assertEqual(
+            self.client.get("/posts/admin/audit-logs/export/", {"output": "xml"}).status_code, 400
+        )
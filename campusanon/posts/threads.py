@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+# Threaded comments. Every comment stores a materialized `path`: its
+# ancestors' segments followed by its own. Sorting by path gives thread
+# (depth-first) order and a whole subtree is one contiguous path range, so
+# no recursive queries are needed.
+#
+# Segments are digits only: the order is the same under any database
+# collation, and a subtree's upper bound is just "path + 1".
+
+MAX_DEPTH = 4           # replies below this attach to the parent's parent
+SEGMENT_LENGTH = 22     # 16 digits of µs since epoch + 6 digits of the id
+PATH_LENGTH = SEGMENT_LENGTH * (MAX_DEPTH + 1)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def segment(created_at, comment_id):
+    micros = (created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{micros:016d}{comment_id.int % 10 ** 6:06d}"
+
+
+def subtree_end(path):
+    """
+    Exclusive upper bound: every descendant of `path` sorts before it.
+    """
+    return str(int(path) + 1).zfill(len(path))
+
+
+def top_segment(path):
+    return path[:SEGMENT_LENGTH]
+
+
+def thread_fields(parent=None):
+    """
+    id / parent / path / depth for a new comment, top-level or replying to
+    `parent`. Replies past MAX_DEPTH become siblings of `parent`.
+    """
+    comment_id = uuid.uuid4()
+    own = segment(timezone.now(), comment_id)
+    if parent is None:
+        return {"id": comment_id, "parent": None, "path": own, "depth": 0}
+
+    if parent.depth >= MAX_DEPTH:
+        parent = type(parent).objects.get(pk=parent.parent_id)
+    return {
+        "id": comment_id,
+        "parent": parent,
+        "path": parent.path + own,
+        "depth": parent.depth + 1,
+    }
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from campusanon.redis import redis_client, write_if_unchanged
+from .models import Post
+
+# Newest N visible posts per community. Deeper pages fall back to SQL.
+TIMELINE_SIZE = 1000
+
+# timeline_state:{community} is "complete" when the set holds every visible
+# post of the community, "partial" once older posts have been trimmed off.
+# No state key means the timeline is cold.
+#
+# Every change (add, remove, invalidate) bumps timeline_gen:{community},
+# cold or not. rebuild() reads it before its query and only stores the
+# result if it is unchanged: a post committed while the query ran can't go
+# missing from a timeline marked complete.
+COMPLETE = "complete"
+PARTIAL = "partial"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def timeline_key(community_id):
+    return f"timeline:{community_id}"
+
+
+def state_key(community_id):
+    return f"timeline_state:{community_id}"
+
+
+def generation_key(community_id):
+    return f"timeline_gen:{community_id}"
+
+
+def to_score(created_at):
+    # Integer microseconds since epoch: exact in a Redis double until year 2255
+    return (created_at - EPOCH) // timedelta(microseconds=1)
+
+
+def from_score(score):
+    return EPOCH + timedelta(microseconds=int(score))
+
+
+def add_post(post):
+    """
+    Pushes a visible post onto its community timeline (create / unhide).
+    Cold timelines are left alone, the next rebuild picks the post up.
+    """
+    key = timeline_key(post.community_id)
+    score = to_score(post.created_at)
+
+    pipe = redis_client.pipeline()
+    pipe.incr(generation_key(post.community_id))
+    pipe.get(state_key(post.community_id))
+    pipe.zrange(key, 0, 0, withscores=True)
+    _, state, tail = pipe.execute()
+
+    if state is None:
+        return
+    # Older than the trimmed tail: adding it would leave a gap in the set
+    if state == PARTIAL and tail and score < tail[0][1]:
+        return
+
+    pipe = redis_client.pipeline()
+    pipe.zadd(key, {str(post.id): score})
+    pipe.zremrangebyrank(key, 0, -(TIMELINE_SIZE + 1))
+    _, trimmed = pipe.execute()
+
+    if trimmed:
+        redis_client.set(state_key(post.community_id), PARTIAL)
+
+
+def remove_post(post):
+    """
+    Drops a post from its community timeline (hide / delete).
+    """
+    pipe = redis_client.pipeline()
+    pipe.incr(generation_key(post.community_id))
+    pipe.zrem(timeline_key(post.community_id), str(post.id))
+    pipe.execute()
+
+
+def rebuild(community_id):
+    """
+    Repopulates a community timeline from Post. Returns the number of
+    entries, or None if a post changed meanwhile: the timeline stays cold
+    and the next read tries again.
+    """
+    generation = redis_client.get(generation_key(community_id))
+    rows = list(
+        Post.objects.filter(community_id=community_id, is_hidden=False)
+        .order_by("-created_at", "-id")
+        .values_list("id", "created_at")[:TIMELINE_SIZE]
+    )
+
+    def write(pipe):
+        key = timeline_key(community_id)
+        pipe.delete(key)
+        if rows:
+            pipe.zadd(key, {str(pk): to_score(created_at) for pk, created_at in rows})
+        pipe.set(state_key(community_id), PARTIAL if len(rows) == TIMELINE_SIZE else COMPLETE)
+
+    if not write_if_unchanged(generation_key(community_id), generation, write):
+        return None
+    return len(rows)
+
+
+def invalidate(community_id, pipe=None):
+    """
+    Marks the timeline cold after set-based changes; the next first-page
+    read rebuilds it. Queued on `pipe` when given.
+    """
+    pipe = pipe or redis_client
+    pipe.incr(generation_key(community_id))
+    pipe.delete(state_key(community_id), timeline_key(community_id))
+
+
+def read_page(community_id, after, limit):
+    """
+    Returns up to `limit` (post_id, created_at) pairs newer-first, strictly
+    after the (created_at, id) key `after`. Order matches
+    ORDER BY created_at DESC, id DESC.
+
+    Returns None when the timeline cannot answer (cold, or the page runs
+    past the trimmed tail) and the caller should use SQL instead.
+    """
+    key = timeline_key(community_id)
+
+    if after is None:
+        pipe = redis_client.pipeline()
+        pipe.get(state_key(community_id))
+        pipe.zrevrangebyscore(key, "+inf", "-inf", start=0, num=limit, withscores=True)
+        state, entries = pipe.execute()
+    else:
+        after_at, after_id = after
+        max_score = to_score(after_at)
+        after_id = str(after_id)
+
+        pipe = redis_client.pipeline()
+        pipe.get(state_key(community_id))
+        pipe.zcount(key, max_score, max_score)
+        state, ties = pipe.execute()
+        if state is None:
+            return None
+
+        # Same-score members are ordered by member desc, like id DESC in SQL.
+        # Fetch the ties too and drop the ones at or before the cursor.
+        entries = redis_client.zrevrangebyscore(
+            key, max_score, "-inf", start=0, num=limit + ties, withscores=True
+        )
+        entries = [
+            (member, score) for member, score in entries
+            if int(score) < max_score or member < after_id
+        ][:limit]
+
+    if state is None:
+        return None
+    if len(entries) < limit and state != COMPLETE:
+        return None
+
+    return [(member, from_score(score)) for member, score in entries]
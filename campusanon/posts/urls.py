@@ -2,18 +2,24 @@ from django.urls import path
 from .views import (
     CreatePostView,
     CommunityFeedView,
+    HomeFeedView,
     DeletePostView,
     CreateCommentView,
     GetPostView,
     PostCommentsView,
+    ThreadRepliesView,
     ToggleLikeView,
+    ToggleCommentLikeView,
     ReportPostView,
     ReportCommentView,
     AdminBanUserView,
     AdminUnbanUserView,
     AdminUnhidePostView,
     AdminUnhideCommentView,
+    AdminBulkModerationView,
+    AdminModerationQueueView,
     AdminAuditLogView,
+    AdminAuditLogExportView,
     SearchPostsView,
     NotificationListView,
     MarkNotificationReadView,
@@ -25,14 +31,17 @@ urlpatterns = [
     # Posts
     path("create/", CreatePostView.as_view(), name="create-post"),
     path("feed/<uuid:community_id>/", CommunityFeedView.as_view(), name="community-feed"),
+    path("home/", HomeFeedView.as_view(), name="home-feed"),
     path("delete/<uuid:post_id>/", DeletePostView.as_view(), name="delete-post"),
     path("get/<uuid:post_id>/", GetPostView.as_view(), name="get-single-post"),
 
     # Comments
     path("comment/<uuid:post_id>/", CreateCommentView.as_view(), name="create-comment"),
     path("comment/<uuid:post_id>/list/", PostCommentsView.as_view(), name="list-comments"),
+    path("comment/<uuid:comment_id>/replies/", ThreadRepliesView.as_view(), name="comment-replies"),
 
     path("like/<uuid:post_id>/", ToggleLikeView.as_view()),
+    path("comment/like/<uuid:comment_id>/", ToggleCommentLikeView.as_view(), name="like-comment"),
 
     path("report/<uuid:post_id>/", ReportPostView.as_view(), name="report-post"),
     path("comment/report/<uuid:comment_id>/", ReportCommentView.as_view(), name="report-comment"),
@@ -42,7 +51,10 @@ urlpatterns = [
     path("admin/user/unban/<uuid:user_id>/", AdminUnbanUserView.as_view(), name="admin-unban-user"),
     path("admin/post/unhide/<uuid:post_id>/", AdminUnhidePostView.as_view(), name="admin-unhide-post"),
     path("admin/comment/unhide/<uuid:comment_id>/", AdminUnhideCommentView.as_view(), name="admin-unhide-comment"),
+    path("admin/bulk/", AdminBulkModerationView.as_view(), name="admin-bulk-moderation"),
+    path("admin/queue/", AdminModerationQueueView.as_view(), name="admin-moderation-queue"),
     path("admin/audit-logs/", AdminAuditLogView.as_view(), name="admin-audit-logs"),
+    path("admin/audit-logs/export/", AdminAuditLogExportView.as_view(), name="admin-audit-logs-export"),
 
     # Search
     path("search/", SearchPostsView.as_view(), name="search-posts"),
@@ -0,0 +1,113 @@
+from campusanon.redis import redis_client
+from .models import PostLike, PostReport, CommentLike, CommentReport
+
+# Per-user membership sets behind the personal flags of list responses:
+#   liked:{user_id}              posts the user liked
+#   reported:{user_id}           posts the user reported
+#   liked_comments:{user_id}     comments the user liked
+#   reported_comments:{user_id}  comments the user reported
+#
+# Loaded lazily from the DB on first read and kept up to date by
+# posts/signals.py. SENTINEL marks a loaded set, so "loaded, empty" and
+# "not loaded" are different. The TTL bounds drift from any missed update.
+#
+# Every update also bumps {flag}_gen:{user_id}, loaded or not. A load reads
+# the generation before its query and only stores its snapshot if nothing
+# changed meanwhile: a slow load can't overwrite a concurrent like.
+
+SENTINEL = "-"
+FLAG_TTL = 60 * 60 * 24
+
+FLAGS = {
+    "liked": (PostLike, "user_id", "post_id"),
+    "reported": (PostReport, "reporter_id", "post_id"),
+    "liked_comments": (CommentLike, "user_id", "comment_id"),
+    "reported_comments": (CommentReport, "reporter_id", "comment_id"),
+}
+
+
+def flag_key(flag, user_id):
+    return f"{flag}:{user_id}"
+
+
+def generation_key(flag, user_id):
+    return f"{flag}_gen:{user_id}"
+
+
+# Sets that aren't loaded stay unloaded: a lone member would look complete
+_update = redis_client.register_script("""
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call(ARGV[1], KEYS[1], ARGV[2])
+end
+""")
+
+# ARGV: generation read before the load, TTL, members (SENTINEL first).
+# SADD in chunks: unpack() has a stack limit.
+_fill = redis_client.register_script("""
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+for i = 3, #ARGV, 1000 do
+    redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+""")
+
+
+def add(flag, user_id, object_id):
+    _update(keys=[flag_key(flag, user_id), generation_key(flag, user_id)],
+            args=["SADD", str(object_id), FLAG_TTL])
+
+
+def remove(flag, user_id, object_id):
+    _update(keys=[flag_key(flag, user_id), generation_key(flag, user_id)],
+            args=["SREM", str(object_id), FLAG_TTL])
+
+
+def _load(flag, user_id, generation):
+    model, user_field, object_field = FLAGS[flag]
+    ids = {
+        str(pk) for pk in model.objects.filter(
+            **{user_field: user_id}
+        ).values_list(object_field, flat=True)
+    }
+
+    # Not stored if an update came in since `generation` was read: the next
+    # lookup loads again
+    _fill(
+        keys=[flag_key(flag, user_id), generation_key(flag, user_id)],
+        args=[generation or "0", FLAG_TTL, SENTINEL, *ids],
+    )
+    return ids
+
+
+def lookup(user_id, flags, ids):
+    """
+    {flag: set of ids the user has that flag on}, for one page of ids.
+    One round trip (EXISTS + SMISMEMBER + generation per flag) once the
+    sets are loaded.
+    """
+    ids = [str(pk) for pk in ids]
+    if not ids:
+        return {flag: set() for flag in flags}
+
+    pipe = redis_client.pipeline(transaction=False)
+    for flag in flags:
+        key = flag_key(flag, user_id)
+        pipe.exists(key)
+        pipe.smismember(key, ids)
+        pipe.get(generation_key(flag, user_id))
+    replies = pipe.execute()
+
+    found = {}
+    for i, flag in enumerate(flags):
+        loaded, hits, generation = replies[3 * i:3 * i + 3]
+        if loaded:
+            found[flag] = {pk for pk, hit in zip(ids, hits) if hit}
+        else:
+            found[flag] = _load(flag, user_id, generation).intersection(ids)
+    return found
@@ -41,13 +41,14 @@ def is_rate_limited_redis(user_id, action, limit, window_seconds):
     return False
 
 
-def log_admin_action(admin, action, target_id, target_type, reason=""):
+def log_admin_action(admin, action, target_id, target_type, reason="", details=None):
     AdminAuditLog.objects.create(
         admin=admin,
         action=action,
         target_id=target_id,
         target_type=target_type,
-        reason=reason
+        reason=reason,
+        details=details or {}
     )
 
 
@@ -1,25 +1,27 @@
+import heapq
+from itertools import islice
+
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils.dateparse import parse_datetime
 from django.utils import timezone
-from django.db.models import Count, Exists, OuterRef
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber, Substr
+from django.core.exceptions import ValidationError
 from rest_framework.exceptions import PermissionDenied
-from django.shortcuts import get_object_or_404
-from communities.models import Community, CommunityMembership # Check your paths
+from communities.models import Community
+from communities.access import can_read_community, home_community_ids, readable_community_ids
+from communities.presence import record_heartbeat
 from django.db.models import Q
 from django.core.cache import cache
-from campusanon.redis import redis_client
+from django.http import StreamingHttpResponse
 
 from accounts.models import User
 from .models import (
     Post,
     Comment,
-    PostLike,
-    PostReport,
-    CommentReport,
-    AdminAuditLog,  # ✅ Imported Model
     Notification,
 )
 from .utils import (
@@ -28,11 +30,207 @@ from .utils import (
     log_admin_action  # ✅ Imported Helper
 )
 from .permissions import IsAdminUser
+from .pagination import KeysetPaginator, InvalidCursor, encode_cursor, decode_cursor
+from .feed_cache import get_or_build_page
+from .personalize import personalize_posts
+from .likes import toggle_post_like, toggle_comment_like
+from .projections import CommentRow, NotificationRow, QueuedPostRow, QueuedCommentRow, AuditLogRow, project
+from . import timeline, post_cache, rankings, like_buffer, user_flags, threads, moderation, bulk_moderation, audit_log
+from .threads import thread_fields
+from .etags import make_etag, not_modified, community_version_key, post_version_key
 
-REPORT_THRESHOLD = 3
-COMMENT_REPORT_THRESHOLD = 3
 PAGE_SIZE = 20
 COMMENT_PAGE_SIZE = 20
+SEARCH_PAGE_SIZE = 50
+COMMENT_PREVIEW_SIZE = 3
+REPLY_PREVIEW_SIZE = 3
+REPLY_PAGE_SIZE = 20
+NOTIFICATION_PAGE_SIZE = 30
+QUEUE_PAGE_SIZE = 50
+AUDIT_LOG_PAGE_SIZE = 100
+
+# Keyset paginators: (created_at, id) so equal timestamps never skip/repeat
+FEED_PAGINATOR = KeysetPaginator(["-created_at", "-id"], PAGE_SIZE)
+# Comments page by materialized path (posts/threads.py): thread order
+COMMENT_PAGINATOR = KeysetPaginator(["path"], COMMENT_PAGE_SIZE)
+REPLY_PAGINATOR = KeysetPaginator(["path"], REPLY_PAGE_SIZE)
+SEARCH_PAGINATOR = KeysetPaginator(["-created_at", "-id"], SEARCH_PAGE_SIZE)
+NOTIFICATION_PAGINATOR = KeysetPaginator(["-created_at", "-id"], NOTIFICATION_PAGE_SIZE)
+# Moderation queue: most reported first, served by partial indexes on
+# reports_count > 0 (see Post / Comment Meta)
+QUEUE_PAGINATOR = KeysetPaginator(["-reports_count", "-created_at", "-id"], QUEUE_PAGE_SIZE)
+AUDIT_LOG_PAGINATOR = KeysetPaginator(["-created_at", "-id"], AUDIT_LOG_PAGE_SIZE)
+
+
+def invalid_cursor_response():
+    return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def access_denied_response():
+    return Response(
+        {"error": "🚫 Access Denied: You do not belong to this community."},
+        status=status.HTTP_403_FORBIDDEN
+    )
+
+
+def community_feed_entries(community_id, after, limit):
+    """
+    Up to `limit` (post_id, created_at) pairs of a community feed, newest
+    first, strictly after the decoded cursor `after`. Read from the Redis
+    timeline when it can answer, otherwise one bounded index range scan.
+    """
+    entries = timeline.read_page(community_id, after, limit)
+    if entries is not None:
+        return entries
+
+    # Cold timeline (or past its tail): plain SQL
+    posts = FEED_PAGINATOR.after(
+        Post.objects.filter(community_id=community_id, is_hidden=False),
+        after
+    ).values_list("id", "created_at")[:limit]
+    entries = [(str(pk), created_at) for pk, created_at in posts]
+
+    if after is None:
+        timeline.rebuild(community_id)
+    return entries
+
+
+def feed_page_from_entries(entries):
+    """
+    Cuts PAGE_SIZE + 1 feed entries down to (post_ids, next_cursor).
+    """
+    next_cursor = None
+    if len(entries) > PAGE_SIZE:
+        entries = entries[:PAGE_SIZE]
+        last_id, last_created_at = entries[-1]
+        next_cursor = FEED_PAGINATOR.cursor_for([last_created_at, last_id])
+    return [pk for pk, _ in entries], next_cursor
+
+
+def wants_comment_previews(request):
+    return "comments_preview" in request.query_params.get("include", "").split(",")
+
+
+def serialize_comments(comments, user):
+    """
+    Client shape of CommentRows. is_liked / is_reported come from the
+    user's sets (posts/user_flags.py) in one round trip, no query.
+    """
+    flags = user_flags.lookup(
+        user.id, ("liked_comments", "reported_comments"), [c.id for c in comments]
+    )
+    liked, reported = flags["liked_comments"], flags["reported_comments"]
+
+    return [
+        {
+            "id": str(c.id),
+            "alias": c.alias,
+            "content": c.content,
+            "created_at": c.created_at,
+            "likes_count": c.likes_count,
+            "parent_id": str(c.parent_id) if c.parent_id else None,
+            "depth": c.depth,
+            "replies_count": c.replies_count,
+            "is_liked": str(c.id) in liked,
+            "is_mine": c.user_id == user.id,
+            "is_reported": str(c.id) in reported,
+        }
+        for c in comments
+    ]
+
+
+def thread_page(tops, user):
+    """
+    Top-level comments with their first REPLY_PREVIEW_SIZE replies (thread
+    order) under "replies". All replies of the page come from one range
+    scan over the page's path span, ROW_NUMBER() per thread.
+    "replies_cursor" continues in ThreadRepliesView when there are more.
+    """
+    if not tops:
+        return []
+
+    replies = project(
+        Comment.objects.filter(
+            post_id=tops[0].post_id,
+            is_hidden=False,
+            depth__gt=0,
+            path__gt=tops[0].path,
+            path__lt=threads.subtree_end(tops[-1].path),
+        )
+        .annotate(row=Window(
+            RowNumber(),
+            partition_by=[Substr("path", 1, threads.SEGMENT_LENGTH)],
+            order_by=[F("path").asc()]
+        ))
+        .filter(row__lte=REPLY_PREVIEW_SIZE + 1)
+        .order_by("path"),
+        CommentRow,
+    )
+
+    by_thread = {}
+    for r in replies:
+        by_thread.setdefault(threads.top_segment(r.path), []).append(r)
+
+    rows = tops + replies
+    serialized = dict(zip((c.id for c in rows), serialize_comments(rows, user)))
+
+    results = []
+    for top in tops:
+        # Replies under hidden top-level comments are in the span too
+        thread = by_thread.get(top.path, [])
+        shown = thread[:REPLY_PREVIEW_SIZE]
+        item = serialized[top.id]
+        item["replies"] = [serialized[r.id] for r in shown]
+        item["replies_cursor"] = (
+            REPLY_PAGINATOR.cursor_for([shown[-1].path])
+            if len(thread) > REPLY_PREVIEW_SIZE else None
+        )
+        results.append(item)
+    return results
+
+
+def attach_comment_previews(results, user):
+    """
+    Adds the first COMMENT_PREVIEW_SIZE visible top-level comments to every
+    post dict.
+    One windowed query for the whole page (ROW_NUMBER() per post), personal
+    flags from Redis. "comments_count" is the stored total.
+    """
+    post_ids = [item["id"] for item in results]
+    if not post_ids:
+        return results
+
+    comments = project(
+        Comment.objects.filter(post_id__in=post_ids, depth=0, is_hidden=False)
+        .annotate(row=Window(
+            RowNumber(),
+            partition_by=[F("post_id")],
+            order_by=[F("path").asc()]
+        ))
+        .filter(row__lte=COMMENT_PREVIEW_SIZE)
+        .order_by("post_id", "path"),
+        CommentRow,
+    )
+
+    previews = {}
+    for c, data in zip(comments, serialize_comments(comments, user)):
+        previews.setdefault(str(c.post_id), []).append(data)
+
+    for item in results:
+        item["comments_preview"] = previews.get(item["id"], [])
+    return results
+
+
+def community_access_error(user, community_id):
+    """
+    None if the user may read the community, otherwise the error Response.
+    The common (allowed) case is a cached set lookup, no queries.
+    """
+    if can_read_community(user, community_id):
+        return None
+    if not Community.objects.filter(id=community_id).exists():
+        return Response({"error": "Community not found"}, status=status.HTTP_404_NOT_FOUND)
+    return access_denied_response()
 
 
 # -------------------------------
@@ -78,10 +276,10 @@ class CreatePostView(APIView):
         if not community_id or not content:
             return Response({"error": "Data required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            community = Community.objects.get(id=community_id)
-        except Community.DoesNotExist:
-            return Response({"error": "Community not found"}, status=status.HTTP_404_NOT_FOUND)
+        # 🔒 Can only post where you can read
+        error = community_access_error(request.user, community_id)
+        if error:
+            return error
 
         # 2. ALIAS (loyaldude for God Mode)
         if is_god_mode:
@@ -92,7 +290,7 @@ class CreatePostView(APIView):
 
         post = Post.objects.create(
             user=request.user,
-            community=community,
+            community_id=community_id,
             content=content,
             alias=post_alias,
             post_type=post_type, 
@@ -107,6 +305,7 @@ class CreatePostView(APIView):
             "is_mine": True,            # 👈 ADD THIS LINE
             "is_liked": False,          # 👈 Good to have default
             "likes_count": 0,           # 👈 Good to have default
+            "comments_count": 0,
             "is_reported": False        # 👈 Good to have default
         }, status=status.HTTP_201_CREATED)
 
@@ -121,116 +320,130 @@ class CommunityFeedView(APIView):
         user = request.user
 
         # --- NEW: LIGHTWEIGHT ONLINE COUNTER HEARTBEAT ---
-        # Mark user as active in this community for 60 seconds
-        # Using a pattern like presence:community_id:user_id
-        presence_key = f"presence:{community_id}:{user.id}"
-        redis_client.setex(presence_key, 60, "active")
+        # Debounced + flushed in the background (communities/presence.py),
+        # no Redis round trip on this request.
+        record_heartbeat(community_id, user.id)
 
-        # 1. Get Community (or 404)
-        community = get_object_or_404(Community, id=community_id)
+        # ---------------------------------------------------------
+        # 🔒 SECURITY CHECK (cached access set, see communities/access.py)
+        # ---------------------------------------------------------
+        error = community_access_error(user, community_id)
+        if error:
+            return error
+
+        cursor = request.query_params.get("cursor")
+        sort = request.query_params.get("sort", "new")
+
+        if sort != "new" and sort not in rankings.MODES:
+            return Response({"error": "Invalid sort"}, status=status.HTTP_400_BAD_REQUEST)
+
+        include_previews = wants_comment_previews(request)
+
+        # 🏷️ Conditional GET: answer 304 before any ORM query
+        etag = make_etag(user, community_version_key(community_id), sort, include_previews, cursor)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
 
         # ---------------------------------------------------------
-        # 🔒 SECURITY CHECK (The "Bouncer")
+        # 🔥 HOT / TOP: page of IDs straight from the ranking ZSET
         # ---------------------------------------------------------
-        # We must verify if the user is actually allowed to see this feed.
-        
-        has_access = False
-
-        # Rule 1: Allow if Community is Global (All)
-        if community.is_global:
-            has_access = True
-            
-        # Rule 2: Allow if User is Admin/Staff (God Mode)
-        elif user.is_staff or user.is_superuser:
-            has_access = True
-
-        # Rule 3: Allow if User matches Year AND Branch
-        # (e.g. If community is "3 IT", user must be Year 3 and Branch IT)
-        # Note: If community.year is None, it ignores year (e.g. "All IT Students")
-        elif (
-            (community.year is None or community.year == user.year) and 
-            (community.branch is None or community.branch == user.branch)
-        ):
-            has_access = True
-            
-        # Rule 4: Allow if User is explicitly a member (e.g. joined a club manually)
-        elif CommunityMembership.objects.filter(user=user, community=community).exists():
-            has_access = True
-
-        # 🚨 FINAL VERDICT
-        if not has_access:
-            return Response(
-                {"error": "🚫 Access Denied: You do not belong to this community."},
-                status=status.HTTP_403_FORBIDDEN
-            )
+        if sort != "new":
+            offset = 0
+            if cursor:
+                try:
+                    cursor_sort, offset = decode_cursor(cursor)
+                    offset = int(offset)
+                except (InvalidCursor, TypeError, ValueError):
+                    return invalid_cursor_response()
+                if cursor_sort != sort or offset < 0:
+                    return invalid_cursor_response()
+
+            ids = rankings.read_page(sort, community_id, offset, PAGE_SIZE + 1)
+            next_cursor = None
+            if len(ids) > PAGE_SIZE:
+                ids = ids[:PAGE_SIZE]
+                next_cursor = encode_cursor([sort, offset + PAGE_SIZE])
+
+            results = personalize_posts(post_cache.hydrate(ids), user)
+            if include_previews:
+                attach_comment_previews(results, user)
+
+            return Response({
+                "results": results,
+                "next_cursor": next_cursor
+            }, headers={"ETag": etag})
 
         # ---------------------------------------------------------
-        # 🚀 OPTIMIZED QUERY (Your original logic)
+        # 🚀 SHARED PAGE + PERSONAL OVERLAY
         # ---------------------------------------------------------
-        
-        cursor = request.query_params.get("cursor")
+        # The page (just post IDs) is the same for every reader and is cached
+        # per community + cursor. Posts come from the post cache, only the
+        # personal flags are resolved per user.
 
-        # Subquery: Did THIS user like the post?
-        is_liked_by_user = PostLike.objects.filter(
-            post=OuterRef('pk'),
-            user=user
-        )
+        def build_page():
+            after = FEED_PAGINATOR.parse_cursor(Post, cursor)
+            entries = community_feed_entries(community_id, after, PAGE_SIZE + 1)
+            ids, next_cursor = feed_page_from_entries(entries)
+            return {"ids": ids, "next_cursor": next_cursor}
 
-        # Subquery: Did THIS user report the post?
-        is_reported_by_user = PostReport.objects.filter(
-            post=OuterRef('pk'),
-            reporter=user
-        )
+        try:
+            page = get_or_build_page(community_id, cursor, build_page)
+        except InvalidCursor:
+            return invalid_cursor_response()
 
-        # Main Query with Annotation
-        posts = Post.objects.filter(
-            community=community,  # Filter by the secure community object
-            is_hidden=False
-        ).annotate(
-            # Count likes directly in DB
-            total_likes=Count('likes'),
-            # Boolean checks
-            is_liked=Exists(is_liked_by_user),
-            is_reported=Exists(is_reported_by_user)
-        )
+        results = personalize_posts(post_cache.hydrate(page["ids"]), user)
+        if include_previews:
+            attach_comment_previews(results, user)
 
-        # Cursor Pagination Logic
-        if cursor:
-            cursor_dt = parse_datetime(cursor)
-            if cursor_dt:
-                posts = posts.filter(created_at__lt=cursor_dt)
+        return Response({
+            "results": results,
+            "next_cursor": page["next_cursor"]
+        }, headers={"ETag": etag})
 
-        # Order & Slice
-        posts = list(
-            posts.order_by("-created_at")[:PAGE_SIZE]
-        )
+# -------------------------------
+# HOME FEED (all my communities, one cursor)
+# -------------------------------
+class HomeFeedView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        # Serialize Data
-        data = [
-            {
-                "id": str(p.id),
-                "alias": p.alias,
-                "content": p.content,
-                "post_type": p.post_type,
-                "created_at": p.created_at,
-                "likes_count": p.total_likes,
-                "is_liked": p.is_liked,
-                "is_mine": p.user_id == user.id,
-                "is_reported": p.is_reported
-            }
-            for p in posts
-        ]
+    def get(self, request):
+        user = request.user
 
-        # Calculate Next Cursor
-        next_cursor = None
-        if posts:
-            next_cursor = posts[-1].created_at.isoformat()
+        try:
+            after = FEED_PAGINATOR.parse_cursor(Post, request.query_params.get("cursor"))
+        except InvalidCursor:
+            return invalid_cursor_response()
+
+        # k-way merge of per-community pages. Each one is bounded to
+        # PAGE_SIZE + 1 entries, so the merge never looks at more than that
+        # per community regardless of how deep the client has scrolled.
+        per_community = [
+            community_feed_entries(community_id, after, PAGE_SIZE + 1)
+            for community_id in home_community_ids(user)
+        ]
+        merged = list(islice(
+            heapq.merge(
+                *per_community,
+                key=lambda entry: (entry[1], entry[0]),
+                reverse=True
+            ),
+            PAGE_SIZE + 1
+        ))
+
+        ids, next_cursor = feed_page_from_entries(merged)
+
+        # One batched flag lookup for the whole merged page
+        results = personalize_posts(post_cache.hydrate(ids), user)
+        if wants_comment_previews(request):
+            attach_comment_previews(results, user)
 
         return Response({
-            "results": data,
+            "results": results,
             "next_cursor": next_cursor
         })
 
+
 # -------------------------------
 # DELETE OWN POST
 # -------------------------------
@@ -304,6 +517,22 @@ class CreateCommentView(APIView):
         except Post.DoesNotExist:
             return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        if not can_read_community(request.user, post.community_id):
+            return access_denied_response()
+
+        # 🧵 Optional reply target (must be on the same post)
+        parent = None
+        parent_id = request.data.get("parent_id")
+        if parent_id:
+            try:
+                parent = Comment.objects.filter(id=parent_id, post=post).only(
+                    "id", "parent_id", "path", "depth"
+                ).first()
+            except ValidationError:
+                parent = None
+            if parent is None:
+                return Response({"error": "Parent comment not found"}, status=status.HTTP_404_NOT_FOUND)
+
         # 2. ALIAS (loyaldude for God Mode)
         if is_god_mode:
             comment_alias = "loyaldude"
@@ -311,18 +540,24 @@ class CreateCommentView(APIView):
         else:
             comment_alias = generate_alias()
 
-        comment = Comment.objects.create(
-            post=post,
-            user=request.user,
-            content=content,
-            alias=comment_alias,
-        )
+        # Counter update (signals) commits together with the comment row
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post=post,
+                user=request.user,
+                content=content,
+                alias=comment_alias,
+                **thread_fields(parent),
+            )
 
         return Response({
             "id": str(comment.id),
             "alias": comment.alias,
             "content": comment.content,
             "created_at": comment.created_at,
+            "parent_id": str(comment.parent_id) if comment.parent_id else None,
+            "depth": comment.depth,
+            "replies_count": 0,
             "is_mine": True,            # 👈 ADD THIS LINE
             "is_reported": False        # 👈 Good to have default
         }, status=status.HTTP_201_CREATED)
@@ -335,57 +570,88 @@ class PostCommentsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, post_id):
-        try:
-            post = Post.objects.get(id=post_id)
-        except Post.DoesNotExist:
+        entry = post_cache.get_many([post_id]).get(str(post_id))
+        if not entry:
             return Response(
                 {"error": "Post not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        if not can_read_community(request.user, entry["community_id"]):
+            return access_denied_response()
+
         cursor = request.query_params.get("cursor")
 
-        # 👇 1. Define the Subquery (Did I report this?)
-        is_reported_by_user = CommentReport.objects.filter(
-            comment=OuterRef('pk'),
-            reporter=request.user
-        )
+        # 🏷️ Conditional GET: answer 304 before any ORM query
+        etag = make_etag(request.user, post_version_key(post_id), cursor)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
 
-        # 👇 2. Filter & Annotate
-        comments = post.comments.filter(is_hidden=False).annotate(
-            is_reported=Exists(is_reported_by_user)
-        )
+        comments = Comment.objects.filter(post_id=post_id, depth=0, is_hidden=False)
 
-        if cursor:
-            cursor_dt = parse_datetime(cursor)
-            if cursor_dt:
-                comments = comments.filter(created_at__gt=cursor_dt)
+        try:
+            comments, next_cursor = COMMENT_PAGINATOR.paginate(
+                comments, cursor, row_class=CommentRow
+            )
+        except InvalidCursor:
+            return invalid_cursor_response()
 
-        comments = list(
-            comments.order_by("created_at")[:COMMENT_PAGE_SIZE]
-        )
+        # 👇 Top-level comments, each with its first replies
+        data = thread_page(comments, request.user)
 
-        # 👇 3. Send "is_reported" and "is_mine" to frontend
-        data = [
-            {
-                "id": str(c.id),
-                "alias": c.alias,
-                "content": c.content,
-                "created_at": c.created_at,
-                "is_mine": c.user_id == request.user.id,
-                "is_reported": c.is_reported  # ✅ Checks if user reported it
-            }
-            for c in comments
-        ]
+        return Response({
+            "results": data,
+            "next_cursor": next_cursor
+        }, headers={"ETag": etag})
 
-        next_cursor = None
-        if comments:
-            next_cursor = comments[-1].created_at.isoformat()
+
+# -------------------------------
+# LOAD MORE REPLIES (one subtree)
+# -------------------------------
+class ThreadRepliesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, comment_id):
+        parent = Comment.objects.filter(id=comment_id, is_hidden=False).values(
+            "post_id", "path"
+        ).first()
+        if not parent:
+            return Response(
+                {"error": "Comment not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        entry = post_cache.get_many([parent["post_id"]]).get(str(parent["post_id"]))
+        if not entry or not can_read_community(request.user, entry["community_id"]):
+            return access_denied_response()
+
+        cursor = request.query_params.get("cursor")
+
+        etag = make_etag(request.user, post_version_key(parent["post_id"]), comment_id, cursor)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+
+        # The whole subtree is one path range, in thread order
+        replies = Comment.objects.filter(
+            post_id=parent["post_id"],
+            is_hidden=False,
+            path__gt=parent["path"],
+            path__lt=threads.subtree_end(parent["path"]),
+        )
+
+        try:
+            replies, next_cursor = REPLY_PAGINATOR.paginate(
+                replies, cursor, row_class=CommentRow
+            )
+        except InvalidCursor:
+            return invalid_cursor_response()
 
         return Response({
-            "results": data,
+            "results": serialize_comments(replies, request.user),
             "next_cursor": next_cursor
-        })
+        }, headers={"ETag": etag})
 
 
 class ToggleLikeView(APIView):
@@ -410,75 +676,80 @@ class ToggleLikeView(APIView):
                 status=status.HTTP_429_TOO_MANY_REQUESTS
             )
 
-        try:
-            post = Post.objects.get(id=post_id)
-        except Post.DoesNotExist:
+        # One INSERT ... ON CONFLICT or DELETE ... RETURNING, no COUNT(*).
+        # Write-behind mode only records the intent in Redis.
+        if like_buffer.enabled():
+            toggled = like_buffer.toggle(request.user, post_id)
+        else:
+            toggled = toggle_post_like(request.user, post_id)
+        if toggled is None:
             return Response(
                 {"error": "Post not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        like, created = PostLike.objects.get_or_create(
-            user=request.user,
-            post=post
-        )
+        liked, likes_count = toggled
+        return Response({
+            "liked": liked,
+            "likes_count": likes_count
+        })
 
-        if not created:
-            like.delete()
-            return Response({
-                "liked": False,
-                "likes_count": post.likes.count()
-            })
 
+class ToggleCommentLikeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, comment_id):
+        if request.user.is_banned:
+            return Response(
+                {"error": "User is banned"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        # Same budget as post likes
+        if is_rate_limited_redis(
+            request.user.id,
+            action="like",
+            limit=30,
+            window_seconds=60
+        ):
+            return Response(
+                {"error": "Too many actions. Slow down."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+        toggled = toggle_comment_like(request.user, comment_id)
+        if toggled is None:
+            return Response(
+                {"error": "Comment not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        liked, likes_count = toggled
         return Response({
-            "liked": True,
-            "likes_count": post.likes.count()
+            "liked": liked,
+            "likes_count": likes_count
         })
 
 class GetPostView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, post_id):
-        # Subquery to check if user liked this specific post
-        is_liked_by_user = PostLike.objects.filter(
-            post=OuterRef('pk'),
-            user=request.user
-        )
+        # Served from the post cache (community name included, no extra query)
+        entry = post_cache.get_many([post_id]).get(str(post_id))
 
-        # Report subquery
-        is_reported_by_user = PostReport.objects.filter(
-            post=OuterRef('pk'),
-            reporter=request.user
-        )
+        if not entry:
+            return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        try:
-            # We use filter() + first() instead of get() to allow annotation
-            post = Post.objects.filter(id=post_id).annotate(
-                total_likes=Count('likes'),
-                is_liked=Exists(is_liked_by_user),
-                is_reported=Exists(is_reported_by_user)
-            ).first()
-            
-            if not post:
-                return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not can_read_community(request.user, entry["community_id"]):
+            return access_denied_response()
 
-            return Response({
-            "id": str(post.id),
-            "alias": post.alias,
-            "content": post.content,
-            "post_type": post.post_type,
-            "created_at": post.created_at,
-            "likes_count": post.total_likes,
-            "is_liked": post.is_liked,
-            "community_id": str(post.community.id),
-            "community_name": post.community.name,
-            "is_mine": post.user_id == request.user.id,
-            "is_reported": post.is_reported
-        })
+        # 🏷️ Conditional GET: a 304 skips the personal flag lookup
+        etag = make_etag(request.user, post_version_key(post_id))
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
 
-        except Exception as e:
-            print(e)
-            return Response({"error": "Error fetching post"}, status=500)
+        return Response(personalize_posts([entry], request.user)[0], headers={"ETag": etag})
 
 
 class ReportPostView(APIView):
@@ -505,40 +776,25 @@ class ReportPostView(APIView):
 
         reason = request.data.get("reason", "unspecified")
 
-        try:
-            post = Post.objects.get(id=post_id)
-        except Post.DoesNotExist:
+        # Report + counter + threshold hide in one statement (posts/moderation.py)
+        reported = moderation.report(Post, request.user, post_id, reason)
+        if reported is None:
             return Response(
                 {"error": "Post not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if post.is_hidden:
-            return Response(
-                {"message": "Post already hidden"},
-                status=status.HTTP_200_OK
-            )
-
-        report, created = PostReport.objects.get_or_create(
-            post=post,
-            reporter=request.user,
-            defaults={"reason": reason}
-        )
-
+        created, reports_count, hidden = reported
         if not created:
             return Response(
-                {"message": "Already reported"},
+                {"message": "Post already hidden" if hidden else "Already reported"},
                 status=status.HTTP_200_OK
             )
 
-        if post.reports.count() >= REPORT_THRESHOLD:
-            post.is_hidden = True
-            post.save()
-
         return Response({
             "message": "Reported successfully",
-            "reports_count": post.reports.count(),
-            "hidden": post.is_hidden
+            "reports_count": reports_count,
+            "hidden": hidden
         })
 
 
@@ -566,40 +822,24 @@ class ReportCommentView(APIView):
 
         reason = request.data.get("reason", "unspecified")
 
-        try:
-            comment = Comment.objects.get(id=comment_id)
-        except Comment.DoesNotExist:
+        reported = moderation.report(Comment, request.user, comment_id, reason)
+        if reported is None:
             return Response(
                 {"error": "Comment not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if comment.is_hidden:
-            return Response(
-                {"message": "Comment already hidden"},
-                status=status.HTTP_200_OK
-            )
-
-        report, created = CommentReport.objects.get_or_create(
-            comment=comment,
-            reporter=request.user,
-            defaults={"reason": reason}
-        )
-
+        created, reports_count, hidden = reported
         if not created:
             return Response(
-                {"message": "Already reported"},
+                {"message": "Comment already hidden" if hidden else "Already reported"},
                 status=status.HTTP_200_OK
             )
 
-        if comment.reports.count() >= COMMENT_REPORT_THRESHOLD:
-            comment.is_hidden = True
-            comment.save()
-
         return Response({
             "message": "Reported successfully",
-            "reports_count": comment.reports.count(),
-            "hidden": comment.is_hidden
+            "reports_count": reports_count,
+            "hidden": hidden
         })
 
 
@@ -616,7 +856,8 @@ class AdminUnhidePostView(APIView):
             )
 
         post.is_hidden = False
-        post.save()
+        post.hide_reason = ""
+        post.save(update_fields=["is_hidden", "hide_reason"])
 
         # ✅ LOGGING
         log_admin_action(
@@ -642,7 +883,8 @@ class AdminUnhideCommentView(APIView):
             )
 
         comment.is_hidden = False
-        comment.save()
+        comment.hide_reason = ""
+        comment.save(update_fields=["is_hidden", "hide_reason"])
 
         # ✅ LOGGING
         log_admin_action(
@@ -667,18 +909,27 @@ class AdminBanUserView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        user.is_banned = True
-        user.save()
-
-        # ✅ LOGGING
-        log_admin_action(
-            admin=request.user,
-            action="BAN_USER",
-            target_id=user.id,
-            target_type="User",
-            reason=request.data.get("reason", "")
-        )
+        # ?purge=true also hides everything the user posted (reversed on unban)
+        purge = str(request.data.get("purge", request.query_params.get("purge", ""))).lower() == "true"
+
+        with transaction.atomic():
+            user.is_banned = True
+            # save() also drops the cached request user (accounts/signals.py)
+            user.save()
+            hidden = bulk_moderation.purge_user(user) if purge else None
+
+            # ✅ LOGGING (one entry, with the purge counts)
+            log_admin_action(
+                admin=request.user,
+                action="BAN_USER",
+                target_id=user.id,
+                target_type="User",
+                reason=request.data.get("reason", ""),
+                details={"hidden": hidden} if purge else None
+            )
 
+        if purge:
+            return Response({"message": "User banned", "hidden": hidden})
         return Response({"message": "User banned"})
 
 
@@ -694,38 +945,181 @@ class AdminUnbanUserView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        user.is_banned = False
-        user.save()
+        with transaction.atomic():
+            user.is_banned = False
+            # save() also drops the cached request user (accounts/signals.py)
+            user.save()
+            # Content hidden by a ban purge comes back, nothing else does
+            restored = bulk_moderation.restore_user(user)
+
+            # ✅ LOGGING
+            log_admin_action(
+                admin=request.user,
+                action="UNBAN_USER",
+                target_id=user.id,
+                target_type="User",
+                details={"restored": restored} if any(restored.values()) else None
+            )
 
-        # ✅ LOGGING
-        log_admin_action(
-            admin=request.user,
-            action="UNBAN_USER",
-            target_id=user.id,
-            target_type="User"
+        return Response({"message": "User unbanned", "restored": restored})
+
+
+# ✅ Bulk hide / unhide / delete (posts/bulk_moderation.py)
+class AdminBulkModerationView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        target = request.data.get("target")
+        action = request.data.get("action")
+        if target not in bulk_moderation.TARGETS or action not in bulk_moderation.ACTIONS:
+            return Response(
+                {"error": "target must be post or comment, action hide, unhide or delete"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = {key: request.data.get(key) for key in bulk_moderation.FILTERS}
+        if not any(filters[key] for key in ("ids", "alias", "user_id", "keyword")):
+            return Response(
+                {"error": "Select by ids, alias, user_id or keyword"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if filters["ids"] is not None and not isinstance(filters["ids"], list):
+            return Response({"error": "ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            queryset = bulk_moderation.select(target, **filters)
+        except ValidationError:
+            return Response({"error": "Invalid id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        affected = bulk_moderation.apply(
+            request.user, target, action, queryset,
+            reason=request.data.get("reason", "")
         )
 
-        return Response({"message": "User unbanned"})
+        return Response({"target": target, "action": action, "affected": affected})
 
 
-# ✅ NEW: Read-only Audit Log API
-class AdminAuditLogView(APIView):
+# ✅ Moderation queue: posts and comments with reports, one cursor
+class AdminModerationQueueView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        logs = AdminAuditLog.objects.all()[:100]
-
-        return Response([
-            {
-                "admin_id": str(log.admin_id),
-                "action": log.action,
-                "target_type": log.target_type,
-                "target_id": str(log.target_id),
-                "reason": log.reason,
-                "created_at": log.created_at,
+        params = request.query_params
+        kind = params.get("type")
+        if kind not in (None, "post", "comment"):
+            return Response({"error": "type must be post or comment"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            after = QUEUE_PAGINATOR.parse_cursor(Post, params.get("cursor"))
+        except InvalidCursor:
+            return invalid_cursor_response()
+
+        posts = Post.objects.filter(reports_count__gt=0)
+        comments = Comment.objects.filter(reports_count__gt=0)
+        if params.get("community_id"):
+            try:
+                posts = posts.filter(community_id=params["community_id"])
+                comments = comments.filter(post__community_id=params["community_id"])
+            except ValidationError:
+                return Response({"error": "Invalid community_id"}, status=status.HTTP_400_BAD_REQUEST)
+        if params.get("hidden") in ("true", "false"):
+            hidden = params["hidden"] == "true"
+            posts = posts.filter(is_hidden=hidden)
+            comments = comments.filter(is_hidden=hidden)
+
+        # Each source is one bounded index range scan, merged on the key
+        sources = []
+        if kind in (None, "post"):
+            sources.append([
+                ("post", row) for row in
+                project(QUEUE_PAGINATOR.after(posts, after)[:QUEUE_PAGE_SIZE + 1], QueuedPostRow)
+            ])
+        if kind in (None, "comment"):
+            sources.append([
+                ("comment", row) for row in
+                project(QUEUE_PAGINATOR.after(comments, after)[:QUEUE_PAGE_SIZE + 1], QueuedCommentRow)
+            ])
+
+        merged = list(islice(
+            heapq.merge(
+                *sources,
+                key=lambda item: (item[1].reports_count, item[1].created_at, item[1].id),
+                reverse=True
+            ),
+            QUEUE_PAGE_SIZE + 1
+        ))
+
+        next_cursor = None
+        if len(merged) > QUEUE_PAGE_SIZE:
+            merged = merged[:QUEUE_PAGE_SIZE]
+            last = merged[-1][1]
+            next_cursor = encode_cursor([last.reports_count, last.created_at, last.id])
+
+        results = []
+        for target, row in merged:
+            item = {
+                "type": target,
+                "id": str(row.id),
+                "reports_count": row.reports_count,
+                "is_hidden": row.is_hidden,
+                "user_id": str(row.user_id),
+                "alias": row.alias,
+                "content": row.content,
+                "community_id": str(row.community_id),
+                "created_at": row.created_at,
             }
-            for log in logs
-        ])
+            if target == "comment":
+                item["post_id"] = str(row.post_id)
+            results.append(item)
+
+        return Response({
+            "results": results,
+            "next_cursor": next_cursor
+        })
+
+
+# ✅ NEW: Read-only Audit Log API (filters: see posts/audit_log.py)
+class AdminAuditLogView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            logs = audit_log.filter_logs(request.query_params)
+            rows, next_cursor = AUDIT_LOG_PAGINATOR.paginate(
+                logs, request.query_params.get("cursor"), row_class=AuditLogRow
+            )
+        except InvalidCursor:
+            return invalid_cursor_response()
+        except ValidationError:
+            return Response({"error": "Invalid filter value"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "results": [audit_log.serialize_log(row) for row in rows],
+            "next_cursor": next_cursor
+        })
+
+
+# ✅ Audit log export, streamed (?output=ndjson|csv, same filters)
+class AdminAuditLogExportView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        # Not ?format=: DRF reserves it for renderer selection
+        export_format = request.query_params.get("output", "ndjson")
+        if export_format not in audit_log.EXPORT_FORMATS:
+            return Response({"error": "output must be ndjson or csv"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            logs = audit_log.filter_logs(request.query_params)
+        except ValidationError:
+            return Response({"error": "Invalid filter value"}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type = "application/x-ndjson" if export_format == "ndjson" else "text/csv"
+        response = StreamingHttpResponse(
+            audit_log.export_lines(logs, export_format), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="audit-log.{export_format}"'
+        return response
     
 
 class SearchPostsView(APIView):
@@ -741,54 +1135,37 @@ class SearchPostsView(APIView):
 
         query = request.query_params.get("q", "").strip()
         community_id = request.query_params.get("community_id")
+        cursor = request.query_params.get("cursor")
 
         if not query:
-            return Response([], status=status.HTTP_200_OK)
-
-        # 👇 1. Define the "Is Liked?" Subquery
-        is_liked_by_user = PostLike.objects.filter(
-            post=OuterRef('pk'),
-            user=request.user
-        )
+            return Response({"results": [], "next_cursor": None}, status=status.HTTP_200_OK)
 
-        # 👇 1b. Define the "Is Reported?" Subquery
-        is_reported_by_user = PostReport.objects.filter(
-            post=OuterRef('pk'),
-            reporter=request.user
-        )
-
-        # 👇 2. Filter & Annotate
+        # 👇 1. Filter (only the matching IDs come from SQL)
         posts = Post.objects.filter(
             content__icontains=query,
             is_hidden=False
-        )
+        ).only("id", "created_at")
 
+        # 🛡️ Only communities the user may read
         if community_id:
+            if not can_read_community(request.user, community_id):
+                return access_denied_response()
             posts = posts.filter(community_id=community_id)
+        else:
+            posts = posts.filter(community_id__in=readable_community_ids(request.user))
 
-        # Add the "intelligence" (Counts + Flags)
-        posts = posts.annotate(
-            total_likes=Count('likes'),
-            is_liked=Exists(is_liked_by_user),
-            is_reported=Exists(is_reported_by_user)
-        ).order_by("-created_at")[:50]  # Limit to 50 results
-
-        # 👇 3. Return rich data
-        return Response([
-            {
-                "id": str(p.id),
-                "alias": p.alias,
-                "content": p.content,
-                "post_type": p.post_type,
-                "created_at": p.created_at,
-                "likes_count": p.total_likes,
-                "is_liked": p.is_liked,       # ✅ Interactive Heart
-                "is_mine": p.user_id == request.user.id, # ✅ Interactive Delete
-                "is_reported": p.is_reported,
-                "community_id": str(p.community_id),
-            }
-            for p in posts
-        ])
+        try:
+            posts, next_cursor = SEARCH_PAGINATOR.paginate(posts, cursor)
+        except InvalidCursor:
+            return invalid_cursor_response()
+
+        # 👇 2. Return rich data (post cache + batched personal flags)
+        entries = post_cache.hydrate([p.id for p in posts])
+
+        return Response({
+            "results": personalize_posts(entries, request.user),
+            "next_cursor": next_cursor
+        })
     
 
 class CheckNewNotificationsView(APIView):
@@ -811,22 +1188,30 @@ class NotificationListView(APIView):
         cache.delete(f"has_notif_{request.user.id}")
 
         # Fetch notifications for THIS user
-        notifs = Notification.objects.filter(
-            recipient=request.user
-        ).select_related('actor', 'post')
-        
+        notifs = Notification.objects.filter(recipient=request.user)
+
+        try:
+            notifs, next_cursor = NOTIFICATION_PAGINATOR.paginate(
+                notifs, request.query_params.get("cursor"), row_class=NotificationRow
+            )
+        except InvalidCursor:
+            return invalid_cursor_response()
+
         data = []
         for n in notifs:
             data.append({
                 "id": str(n.id),
-                "actor_alias": n.actor.internal_username, 
+                "actor_alias": n.actor_alias,
                 "verb": n.verb, 
-                "post_id": str(n.post.id), 
+                "post_id": str(n.post_id), 
                 "is_read": n.is_read,
                 "created_at": n.created_at
             })
-            
-        return Response(data)
+
+        return Response({
+            "results": data,
+            "next_cursor": next_cursor
+        })
 
 
 # 3. MARK AS READ